@@ -0,0 +1,245 @@
+"""
+Audio file helpers shared by the GUI and the headless tools
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.m4a', '.aiff', '.aif')
+
+# Recognizers work on 16 kHz mono; anything more only makes requests bigger
+TARGET_RATE = 16000
+
+# Source frames decoded per chunk (~1.5 s at 44.1 kHz)
+DECODE_CHUNK_FRAMES = 65536
+
+
+def is_audio_file(path):
+    """Check whether a path has a supported audio extension"""
+    return os.path.splitext(path)[1].lower() in AUDIO_EXTENSIONS
+
+
+def read_audio_file(path, sample_rate=TARGET_RATE):
+    """Decode an audio file to 16-bit mono PCM and return (frame_data, sample_rate, sample_width)"""
+    pcm = b''.join(float_to_pcm16(chunk) for chunk in decode_chunks(path, sample_rate))
+    return pcm, sample_rate, 2
+
+
+def decode_chunks(path, sample_rate=TARGET_RATE, chunk_frames=DECODE_CHUNK_FRAMES):
+    """Yield the audio of a file as mono float32 chunks at sample_rate
+
+    The file is never read whole and nothing is written to disk. PCM WAV is
+    read with the wave module and AIFF/FLAC through speech_recognition, then
+    downmixed and resampled here; MP3, M4A and anything else are piped
+    through ffmpeg, which must be on the PATH.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.wav':
+        try:
+            wav = wave.open(path, 'rb')
+        except wave.Error:
+            wav = None   # float or compressed WAV, which ffmpeg can still read
+        if wav is not None:
+            with wav:
+                width, channels = wav.getsampwidth(), wav.getnchannels()
+                blocks = iter(lambda: wav.readframes(chunk_frames), b'')
+                yield from _resampled((pcm_to_float(block, width, channels) for block in blocks),
+                                      wav.getframerate(), sample_rate)
+            return
+
+    if extension not in ('.aiff', '.aif', '.flac') or shutil.which('ffmpeg'):
+        yield from _ffmpeg_chunks(path, sample_rate, chunk_frames)
+        return
+
+    import speech_recognition as sr
+    with sr.AudioFile(path) as source:
+        width = source.SAMPLE_WIDTH
+        # The stream downmixes to mono little-endian frames as it reads
+        blocks = iter(lambda: source.stream.read(chunk_frames), b'')
+        yield from _resampled((pcm_to_float(block, width) for block in blocks),
+                              source.SAMPLE_RATE, sample_rate)
+
+
+def _resampled(blocks, source_rate, target_rate):
+    resampler = StreamResampler(source_rate, target_rate)
+    for block in blocks:
+        samples = resampler.process(block)
+        if len(samples):
+            yield samples
+    tail = resampler.flush()
+    if len(tail):
+        yield tail
+
+
+def _ffmpeg_chunks(path, sample_rate, chunk_frames):
+    """Decode any container ffmpeg understands through a pipe as 16-bit mono PCM"""
+    if not shutil.which('ffmpeg'):
+        raise ValueError(f"Decoding {os.path.splitext(path)[1] or 'this'} files needs ffmpeg on the PATH")
+    command = ['ffmpeg', '-nostdin', '-v', 'error', '-i', path,
+               '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(sample_rate), '-']
+    process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    try:
+        while True:
+            block = process.stdout.read(chunk_frames * 2)
+            if not block:
+                break
+            yield pcm_to_float(block, 2)
+        error = process.stderr.read().decode('utf-8', 'replace').strip()
+        if process.wait() != 0:
+            raise ValueError(f"ffmpeg could not decode {os.path.basename(path)}: {error}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def pcm_to_float(buffer, sample_width, channels=1):
+    """Decode little-endian PCM bytes into a mono float32 array in [-1, 1]"""
+    if sample_width == 1:
+        samples = (np.frombuffer(buffer, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(buffer, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        samples = np.frombuffer(buffer, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def float_to_pcm16(samples):
+    """Encode a float array in [-1, 1] as 16-bit little-endian PCM bytes"""
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype('<i2').tobytes()
+
+
+def float_to_pcm(samples, sample_width=2):
+    """Encode a float array in [-1, 1] as little-endian PCM of the given sample width"""
+    samples = np.clip(samples, -1.0, 1.0)
+    if sample_width == 1:
+        return (samples * 127.0 + 128.0).astype(np.uint8).tobytes()
+    if sample_width == 2:
+        return float_to_pcm16(samples)
+    if sample_width == 3:
+        ints = (samples * 8388607.0).astype('<i4')
+        return ints.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    if sample_width == 4:
+        return (samples.astype(np.float64) * 2147483647.0).astype('<i4').tobytes()
+    raise ValueError(f"Unsupported sample width: {sample_width}")
+
+
+class StreamResampler:
+    """Resample a mono float stream block by block with no seams between blocks
+
+    Downsampling low-pass filters at the new Nyquist frequency first (a
+    windowed-sinc FIR) so high frequencies do not alias; the filter history
+    and the fractional read position carry over from one block to the next.
+    """
+
+    def __init__(self, source_rate, target_rate, half_taps=32):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.step = source_rate / float(target_rate)
+        self._kernel = None
+        self._delay = 0
+        if target_rate < source_rate:
+            cutoff = 0.5 * target_rate / source_rate
+            taps = np.arange(-half_taps, half_taps + 1)
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+            self._kernel = (kernel / kernel.sum()).astype(np.float32)
+            self._delay = half_taps
+            self._history = np.zeros(2 * half_taps, dtype=np.float32)
+        self._tail = np.zeros(0, dtype=np.float32)
+        # Start half a filter in, where the first real input sample lands
+        self._position = float(self._delay)
+
+    def process(self, samples):
+        """Feed a block of samples and return the resampled output available so far"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.source_rate == self.target_rate:
+            return samples
+        if self._kernel is not None:
+            padded = np.concatenate((self._history, samples))
+            self._history = padded[len(padded) - len(self._history):]
+            samples = np.convolve(padded, self._kernel, mode='valid').astype(np.float32)
+        data = np.concatenate((self._tail, samples))
+        last = len(data) - 1
+        if last < self._position:
+            self._tail = data
+            return np.zeros(0, dtype=np.float32)
+
+        count = int((last - self._position) / self.step) + 1
+        positions = self._position + np.arange(count) * self.step
+        output = np.interp(positions, np.arange(len(data)), data).astype(np.float32)
+        # Keep the sample left of the next read position for interpolation
+        following = self._position + count * self.step
+        keep = min(int(following), last)
+        self._tail = data[keep:]
+        self._position = following - keep
+        return output
+
+    def flush(self):
+        """Return the output still held back by the filter delay"""
+        if self._kernel is None:
+            return np.zeros(0, dtype=np.float32)
+        return self.process(np.zeros(self._delay, dtype=np.float32))
+
+
+def resample(samples, source_rate, target_rate):
+    """Resample a whole mono float array, low-pass filtering first when downsampling"""
+    if source_rate == target_rate or not len(samples):
+        return samples
+    resampler = StreamResampler(source_rate, target_rate)
+    return np.concatenate((resampler.process(samples), resampler.flush()))
+
+
+def decode_audio(data):
+    """Decode in-memory WAV (or AIFF/FLAC) bytes into (mono float32 samples, sample_rate)"""
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wav:
+            frames = wav.readframes(wav.getnframes())
+            return pcm_to_float(frames, wav.getsampwidth(), wav.getnchannels()), wav.getframerate()
+    except (wave.Error, EOFError):
+        pass
+
+    # Some platform voices (e.g. macOS) render AIFF whatever the file name says
+    import speech_recognition as sr
+    with sr.AudioFile(io.BytesIO(data)) as source:
+        audio = sr.Recognizer().record(source)
+    return pcm_to_float(audio.frame_data, audio.sample_width), audio.sample_rate
+
+
+def encode_wav(samples, sample_rate, sample_width=2, channels=1):
+    """Encode mono float samples as PCM WAV bytes, copied to every channel"""
+    pcm = float_to_pcm(samples, sample_width)
+    if channels > 1:
+        pcm = np.repeat(np.frombuffer(pcm, dtype=np.uint8).reshape(-1, sample_width),
+                        channels, axis=0).tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def frame_rms(samples, frame_length):
+    """Return the RMS energy of each consecutive frame of a float array"""
+    count = len(samples) // frame_length
+    frames = samples[:count * frame_length].reshape(count, frame_length)
+    return np.sqrt(np.mean(frames * frames, axis=1))
@@ -0,0 +1,255 @@
+"""
+Headless batch speech export for Voice Converter Pro
+Turns a CSV or JSONL file of prompts into audio files using a process pool
+in which every worker owns its own synthesis engine (pyttsx3 engines cannot
+be shared between threads, let alone processes). Identical prompts are
+synthesized once, failures are retried, and one JSON record per prompt is
+appended to a manifest so interrupted runs can be resumed.
+
+Usage: voice-converter synthesize <prompts.csv|prompts.jsonl> [-o out_dir] [-w workers]
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from batch_transcribe import _parse_options
+from disk_cache import make_key
+from synthesizers import BACKENDS, create_synthesizer
+
+# Synthesizer owned by each worker process, created once by _init_worker
+_worker_synthesizer = None
+_worker_error = None
+
+
+def load_prompts(path, text_field='text', id_field='id'):
+    """Read (id, text) pairs from a CSV file with a header row or a JSONL file
+
+    Rows without an id are numbered by their position in the file; rows
+    with no text are skipped.
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    prompts = []
+    for number, row in enumerate(rows, 1):
+        text = (row.get(text_field) or '').strip()
+        if text:
+            prompts.append((str(row.get(id_field) or f"{number:06d}"), text))
+    return prompts
+
+
+def safe_filename(prompt_id):
+    """Make a prompt id usable as a file name"""
+    return re.sub(r'[^\w.-]', '_', prompt_id).strip('.') or '_'
+
+
+def plan_jobs(prompts, output_dir, backend, options, suffix):
+    """Group prompts by text and settings into one synthesis job each"""
+    jobs = {}
+    for prompt_id, text in prompts:
+        key = make_key(text=text, backend=backend, options=options)
+        job = jobs.setdefault(key, {'key': key, 'text': text, 'ids': [], 'files': []})
+        job['ids'].append(prompt_id)
+        job['files'].append(os.path.join(output_dir, safe_filename(prompt_id) + suffix))
+    return list(jobs.values())
+
+
+def load_manifest(manifest_file):
+    """Return {key: files} for the prompts already exported in a manifest"""
+    completed = {}
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write can leave a truncated last line
+                    continue
+                if record.get('status') == 'ok':
+                    completed.setdefault(record['key'], set()).update(record['files'])
+    except FileNotFoundError:
+        pass
+    return completed
+
+
+def _init_worker(backend, options):
+    """Create the synthesis engine once per worker process"""
+    global _worker_synthesizer, _worker_error
+    try:
+        _worker_synthesizer = create_synthesizer(backend, **options)
+    except Exception as e:
+        # Raising here would break the whole pool; report it per prompt instead
+        _worker_error = f"Speech engine unavailable: {type(e).__name__}: {e}"
+
+
+def _write_file(path, data):
+    """Write a file atomically so an interrupted run never leaves partial audio"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def synthesize_job(job, retries=2, retry_delay=1.0, synthesizer=None):
+    """Synthesize one job, retrying with backoff, and return its manifest record"""
+    synthesizer = synthesizer or _worker_synthesizer
+    record = {'key': job['key'], 'ids': job['ids'], 'files': job['files'], 'chars': len(job['text'])}
+    start = time.perf_counter()
+    if synthesizer is None:
+        record.update(status='error', error=_worker_error, attempts=0, elapsed=0.0)
+        return record
+    for attempt in range(1, retries + 2):
+        record['attempts'] = attempt
+        try:
+            data = synthesizer.synthesize(job['text'])
+            for path in job['files']:
+                _write_file(path, data)
+            record['status'] = 'ok'
+            record['bytes'] = len(data)
+            record.pop('error', None)
+            break
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = f"{type(e).__name__}: {e}"
+            if attempt <= retries:
+                time.sleep(retry_delay * 2 ** (attempt - 1))
+    record['elapsed'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def backend_suffix(backend):
+    """File suffix of a backend's audio, read from its class so no engine is started here"""
+    if backend in BACKENDS:
+        backend_class = BACKENDS[backend]
+    elif ':' in backend:
+        module_name, class_name = backend.split(':', 1)
+        backend_class = getattr(importlib.import_module(module_name), class_name)
+    else:
+        raise ValueError(f"Unknown synthesizer backend: {backend}")
+    return backend_class.suffix or '.bin'
+
+
+def run_batch(prompts, output_dir, manifest_file=None, backend='pyttsx3', options=None,
+              workers=None, retries=2, retry_delay=1.0, resume=True, progress=None):
+    """Export prompts across a process pool, appending results to the manifest"""
+    options = options or {}
+    manifest_file = manifest_file or os.path.join(output_dir, 'manifest.jsonl')
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = plan_jobs(prompts, output_dir, backend, options, backend_suffix(backend))
+
+    if resume:
+        done = load_manifest(manifest_file)
+        pending = [job for job in jobs
+                   if not set(job['files']) <= done.get(job['key'], set())
+                   or not all(os.path.exists(path) for path in job['files'])]
+    else:
+        pending = jobs
+        open(manifest_file, 'w').close()
+
+    summary = {'prompts': len(prompts), 'unique': len(jobs), 'skipped': len(jobs) - len(pending),
+               'ok': 0, 'error': 0, 'chars': 0, 'elapsed': 0.0}
+    if not pending:
+        return summary
+
+    start = time.perf_counter()
+    with open(manifest_file, 'a+', encoding='utf-8') as out:
+        # Terminate a line left half-written by an interrupted run
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != '\n':
+                out.write('\n')
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(backend, options)) as pool:
+            futures = [pool.submit(synthesize_job, job, retries, retry_delay) for job in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+                summary[record['status']] += 1
+                if record['status'] == 'ok':
+                    summary['chars'] += record['chars']
+                if progress:
+                    progress(record)
+
+    summary['elapsed'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def _print_record(record):
+    """Print one line per finished prompt"""
+    name = os.path.basename(record['files'][0])
+    extra = f" (+{len(record['files']) - 1} duplicate)" if len(record['files']) > 1 else ''
+    retried = f", {record['attempts']} attempts" if record['attempts'] > 1 else ''
+    if record['status'] == 'ok':
+        print(f"✅ {name}{extra} ({record['elapsed']:.2f}s{retried})")
+    else:
+        print(f"❌ {name}{extra} ({record['elapsed']:.2f}s{retried}): {record['error']}")
+
+
+def main(argv=None):
+    """Command line entry point for `voice-converter synthesize`"""
+    parser = argparse.ArgumentParser(prog='voice-converter synthesize',
+                                     description='Export a CSV or JSONL file of prompts as audio files.')
+    parser.add_argument('prompts', help="CSV (with a header row) or JSONL file of prompts")
+    parser.add_argument('-o', '--output-dir', default='speech_export',
+                        help='directory for the audio files (default: speech_export)')
+    parser.add_argument('-m', '--manifest',
+                        help='JSONL manifest file (default: OUTPUT_DIR/manifest.jsonl)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='number of worker processes, each with its own engine (default: CPU count)')
+    parser.add_argument('-b', '--backend', default='pyttsx3',
+                        help="synthesizer backend name or 'module:Class' (default: pyttsx3)")
+    parser.add_argument('--backend-option', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra keyword argument for the backend, e.g. rate=150 (repeatable)')
+    parser.add_argument('--text-field', default='text', help="column/key holding the text (default: text)")
+    parser.add_argument('--id-field', default='id',
+                        help="column/key naming each output file (default: id, else the row number)")
+    parser.add_argument('--retries', type=int, default=2,
+                        help='retries per prompt after a failure (default: 2)')
+    parser.add_argument('--no-resume', action='store_true',
+                        help='start over instead of skipping prompts already exported')
+    args = parser.parse_args(argv)
+
+    try:
+        prompts = load_prompts(args.prompts, args.text_field, args.id_field)
+        backend_suffix(args.backend)
+    except (OSError, ValueError, ImportError, AttributeError) as e:
+        print(f"❌ {e}")
+        return 1
+    if not prompts:
+        print(f"❌ No prompts found in {args.prompts}")
+        return 1
+
+    summary = run_batch(prompts, args.output_dir, args.manifest, backend=args.backend,
+                        options=_parse_options(args.backend_option), workers=args.workers,
+                        retries=args.retries, resume=not args.no_resume, progress=_print_record)
+
+    print(f"\nExported {summary['ok']} of {summary['unique']} unique prompt(s) "
+          f"({summary['prompts']} rows), {summary['error']} failed, "
+          f"{summary['skipped']} already done, in {summary['elapsed']:.2f}s")
+    if summary['elapsed']:
+        print(f"Throughput: {(summary['ok'] + summary['error']) / summary['elapsed']:.2f} prompts/s, "
+              f"{summary['chars'] / summary['elapsed']:.0f} chars/s")
+    print(f"Audio written to {args.output_dir}")
+    return 1 if summary['error'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Headless batch transcription for Voice Converter Pro
+Fans audio files out across a process pool and appends one JSON record per
+file to a JSONL results file, so interrupted runs can be resumed.
+
+Usage: voice-converter transcribe <dir|glob> [-o results.jsonl] [-w workers]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from audio_io import is_audio_file, read_audio_file
+from recognizers import create_recognizer
+from stt_cache import DEFAULT_CACHE_DIR, CachedRecognizer, TranscriptCache
+
+# Recognizer owned by each worker process, created once by _init_worker
+_worker_recognizer = None
+_worker_error = None
+
+
+def find_audio_files(target):
+    """Expand a directory, glob pattern or single file into audio file paths"""
+    if os.path.isdir(target):
+        paths = []
+        for dirpath, _dirnames, filenames in os.walk(target):
+            paths.extend(os.path.join(dirpath, name) for name in filenames if is_audio_file(name))
+    elif os.path.isfile(target):
+        paths = [target]
+    else:
+        paths = [path for path in glob.glob(target, recursive=True)
+                 if os.path.isfile(path) and is_audio_file(path)]
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def load_completed(output_file):
+    """Return the set of files already transcribed successfully in a results file"""
+    completed = set()
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write can leave a truncated last line
+                    continue
+                if record.get('status') == 'ok':
+                    completed.add(record['file'])
+    except FileNotFoundError:
+        pass
+    return completed
+
+
+def _init_worker(backend, options, cache_dir=None, bypass_cache=False):
+    """Create the recognizer once per worker process"""
+    global _worker_recognizer, _worker_error
+    try:
+        recognizer = create_recognizer(backend, **options)
+        recognizer.preload()
+    except Exception as e:
+        # Raising here would break the whole pool; report it per file instead
+        _worker_error = f"Recognizer unavailable: {type(e).__name__}: {e}"
+        return
+    _worker_recognizer = recognizer
+    if cache_dir:
+        _worker_recognizer = CachedRecognizer(_worker_recognizer, TranscriptCache(cache_dir),
+                                              bypass=bypass_cache)
+
+
+def transcribe_file(path, recognizer=None):
+    """Transcribe one file and return its result record with timings"""
+    recognizer = recognizer or _worker_recognizer
+    record = {'file': path}
+    if recognizer is None:
+        record.update(status='error', error=_worker_error, elapsed=0.0)
+        return record
+    start = time.perf_counter()
+    try:
+        frame_data, sample_rate, sample_width = read_audio_file(path)
+        loaded = time.perf_counter()
+        record['audio_seconds'] = round(len(frame_data) / float(sample_rate * sample_width), 3)
+        record['text'] = recognizer.recognize(frame_data, sample_rate, sample_width)
+        record['status'] = 'ok'
+        record['load_time'] = round(loaded - start, 4)
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['elapsed'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run_batch(files, output_file, backend='google', options=None, workers=None,
+              resume=True, progress=None, cache_dir=DEFAULT_CACHE_DIR, bypass_cache=False):
+    """Transcribe files across a process pool, appending results to output_file
+
+    Audio recognized before is answered from the transcript cache in
+    cache_dir (None disables it); bypass_cache re-recognizes and refreshes it.
+    """
+    options = options or {}
+    if resume:
+        done = load_completed(output_file)
+        pending = [path for path in files if path not in done]
+    else:
+        pending = list(files)
+        open(output_file, 'w').close()
+
+    summary = {'total': len(files), 'skipped': len(files) - len(pending),
+               'ok': 0, 'error': 0, 'elapsed': 0.0}
+    if not pending:
+        return summary
+
+    start = time.perf_counter()
+    with open(output_file, 'a+', encoding='utf-8') as out:
+        # Terminate a line left half-written by an interrupted run
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != '\n':
+                out.write('\n')
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(backend, options, cache_dir, bypass_cache)) as pool:
+            futures = [pool.submit(transcribe_file, path) for path in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+                summary[record['status']] += 1
+                if progress:
+                    progress(record)
+
+    summary['elapsed'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def _parse_options(pairs):
+    """Turn KEY=VALUE strings into backend keyword arguments"""
+    options = {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        try:
+            options[key] = json.loads(value)
+        except ValueError:
+            options[key] = value
+    return options
+
+
+def _print_record(record):
+    """Print one line per finished file"""
+    name = os.path.basename(record['file'])
+    if record['status'] == 'ok':
+        print(f"✅ {name} ({record['elapsed']:.2f}s): {record['text']}")
+    else:
+        print(f"❌ {name} ({record['elapsed']:.2f}s): {record['error']}")
+
+
+def main(argv=None):
+    """Command line entry point for `voice-converter transcribe`"""
+    parser = argparse.ArgumentParser(prog='voice-converter transcribe',
+                                     description='Transcribe audio files in bulk.')
+    parser.add_argument('target', help='directory, glob pattern or audio file')
+    parser.add_argument('-o', '--output', default='transcripts.jsonl',
+                        help='JSONL results file (default: transcripts.jsonl)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('-b', '--backend', default='google',
+                        help="recognizer backend name or 'module:Class' (default: google)")
+    parser.add_argument('--language', default='en-US', help='recognition language')
+    parser.add_argument('--backend-option', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra keyword argument for the backend (repeatable)')
+    parser.add_argument('--no-resume', action='store_true',
+                        help='start over instead of skipping files already transcribed')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'transcript cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore cached transcripts and re-recognize everything, refreshing the cache')
+    args = parser.parse_args(argv)
+
+    files = find_audio_files(args.target)
+    if not files:
+        print(f"❌ No audio files found for {args.target}")
+        return 1
+
+    options = _parse_options(args.backend_option)
+    options.setdefault('language', args.language)
+
+    summary = run_batch(files, args.output, backend=args.backend, options=options,
+                        workers=args.workers, resume=not args.no_resume,
+                        progress=_print_record, cache_dir=args.cache_dir, bypass_cache=args.no_cache)
+
+    print(f"\nTranscribed {summary['ok']} file(s), {summary['error']} failed, "
+          f"{summary['skipped']} already done, in {summary['elapsed']:.2f}s")
+    if summary['elapsed']:
+        print(f"Throughput: {(summary['ok'] + summary['error']) / summary['elapsed']:.2f} files/s")
+    print(f"Results written to {args.output}")
+    return 1 if summary['error'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
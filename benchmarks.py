@@ -0,0 +1,364 @@
+"""
+Offline benchmark suite for Voice Converter Pro
+Measures the hot paths behind the GUI - file transcription, synthesis to a
+file, history append/search and startup - using synthetic audio and the stub
+recognizer/synthesizer backends, so runs need no network, microphone or
+speakers. Results are written as JSON and can be compared against a stored
+baseline; any metric slower than the threshold fails the run.
+
+Usage: voice-converter bench [--quick] [-o results.json] [--baseline baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from history_store import HistoryStore
+from recognizers import StubRecognizer
+from synthesizers import StubSynthesizer
+
+SUITES = ('transcribe', 'synthesize', 'history', 'startup')
+HISTORY_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+QUICK_HISTORY_SIZES = (10 ** 3, 10 ** 4)
+HISTORY_PAGE_SIZE = 200
+HISTORY_TYPES = ('TTS', 'STT', 'STT (File)')
+# Compared metric -> (threshold multiplier, samples both runs need before it is compared);
+# a tail percentile of a few dozen samples is one or two outliers, not a trend
+COMPARED_METRICS = {'p50_ms': (1.0, 1), 'p95_ms': (1.0, 200), 'p99_ms': (2.0, 1000)}
+
+
+def summarize(samples, work=None, unit=None):
+    """Latency percentiles for a list of durations in seconds
+
+    When work (e.g. seconds of audio or entries written) is given, the
+    throughput in work units per second of wall time is added.
+    """
+    ms = np.asarray(samples, dtype=np.float64) * 1000.0
+    result = {
+        'n': len(samples),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+        'mean_ms': round(float(ms.mean()), 4),
+        'max_ms': round(float(ms.max()), 4),
+    }
+    if work is not None:
+        result['throughput'] = round(work / max(float(np.sum(samples)), 1e-9), 2)
+        result['throughput_unit'] = unit
+    return result
+
+
+def time_calls(func, calls):
+    """Run func(*args) for each args tuple and return the individual durations"""
+    durations = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def write_speech_wav(path, seconds, sample_rate=16000, seed=0):
+    """Write a mono 16-bit WAV of tone bursts separated by short pauses
+
+    The pauses give the streaming transcriber realistic places to cut.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / float(sample_rate)
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 3 * t) > -0.2)
+    signal[(t % 4.0) > 3.4] = 0.0
+    signal += rng.normal(0, 0.003, len(t))
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+
+
+def make_engine(workdir, **backends):
+    """VoiceEngine whose config, history and cache live in workdir"""
+    from voice_engine import VoiceEngine
+    return VoiceEngine(config_file=os.path.join(workdir, 'voice_config.json'),
+                       history_file=os.path.join(workdir, 'voice_history.db'),
+                       legacy_history_file=os.path.join(workdir, 'voice_history.json'),
+                       cache_dir=os.path.join(workdir, 'tts_cache'),
+                       stt_cache_dir=os.path.join(workdir, 'stt_cache'), **backends)
+
+
+def bench_transcribe(workdir, files=5, seconds=60.0, delay=0.0):
+    """engine.transcribe_file (the Upload Audio path) over synthetic WAV files"""
+    paths = []
+    for i in range(files):
+        path = os.path.join(workdir, f"speech_{i}.wav")
+        write_speech_wav(path, seconds, seed=i)
+        paths.append(path)
+
+    engine = make_engine(workdir, stt_backend=StubRecognizer(delay=delay))
+    try:
+        engine.transcribe_file(paths[0])  # warm-up
+        durations = time_calls(engine.transcribe_file, [(path,) for path in paths])
+    finally:
+        engine.close()
+    return {'transcribe.file': summarize(durations, files * seconds, 'audio s/s')}
+
+
+def bench_synthesize(workdir, iterations=200, delay=0.0):
+    """engine.save_audio (the Save Audio path) with the stub synthesizer"""
+    engine = make_engine(workdir, synthesizer=StubSynthesizer(delay=delay))
+    output = os.path.join(workdir, 'speech_out.wav')
+    texts = [f"Sentence number {i} of the synthesis benchmark, long enough to be realistic."
+             for i in range(iterations)]
+    try:
+        engine.save_audio(texts[0], output)  # warm-up
+        durations = time_calls(engine.save_audio, [(text, output) for text in texts])
+
+        # Cached clips are what repeated Speak/Save requests hit
+        cache = engine.speech_cache
+        keys = [cache.key(text, 'en', 'stub') for text in texts]
+        for key, text in zip(keys, texts):
+            cache.put(key, engine.synthesize(text), '.wav')
+        cached = time_calls(cache.get, [(key,) for key in keys])
+    finally:
+        engine.close()
+    characters = sum(len(text) for text in texts)
+    return {
+        'synthesize.to_file': summarize(durations, characters, 'chars/s'),
+        'synthesize.cache_hit': summarize(cached, len(keys), 'clips/s'),
+    }
+
+
+def synthetic_history(count, seed=0, vocabulary=5000, words=12):
+    """Yield (timestamp, type, text) rows with Zipf-distributed words"""
+    rng = np.random.default_rng(seed)
+    vocab = [f"w{i:x}ord" for i in range(vocabulary)]
+    start = datetime(2020, 1, 1)
+    batch = 10000
+    for offset in range(0, count, batch):
+        size = min(batch, count - offset)
+        ids = np.minimum(rng.zipf(1.3, size=(size, words)) - 1, vocabulary - 1)
+        types = rng.integers(0, len(HISTORY_TYPES), size)
+        for row in range(size):
+            timestamp = start + timedelta(minutes=offset + row)
+            yield (timestamp.isoformat(), HISTORY_TYPES[types[row]],
+                   ' '.join(vocab[i] for i in ids[row]))
+
+
+def bench_history(workdir, sizes=HISTORY_SIZES, iterations=200):
+    """HistoryStore append, page and full-text search latency at several sizes"""
+    results = {}
+    for size in sizes:
+        path = os.path.join(workdir, f"history_{size}.db")
+        store = HistoryStore(path)
+        try:
+            rows = synthetic_history(size)
+            start = time.perf_counter()
+            while True:
+                chunk = [row for _, row in zip(range(10000), rows)]
+                if not chunk:
+                    break
+                store.add_many([{'timestamp': ts, 'type': kind, 'text': text} for ts, kind, text in chunk])
+            fill = time.perf_counter() - start
+
+            prefix = f"history.{size}"
+            results[f"{prefix}.fill"] = summarize([fill], size, 'entries/s')
+            results[f"{prefix}.append"] = summarize(
+                time_calls(store.add, [('STT', f"benchmark append number {i} w0ord w1ord")
+                                       for i in range(iterations)]), iterations, 'entries/s')
+            pages = [(None, None, None, None, HISTORY_PAGE_SIZE)] * (iterations // 4)
+            results[f"{prefix}.page"] = summarize(time_calls(store.query, pages))
+            filtered = [(None, None, ['STT (File)'], None, HISTORY_PAGE_SIZE)] * (iterations // 4)
+            results[f"{prefix}.page_filtered"] = summarize(time_calls(store.query, filtered))
+
+            queries = {
+                'common_word': 'w0ord',
+                'rare_word': 'w3e7ord',
+                'prefix': 'w1*',
+                'phrase': '"w0ord w1ord"',
+                'no_match': 'zzzzz',
+            }
+            for name, query in queries.items():
+                calls = [(query, None, None, None, None, HISTORY_PAGE_SIZE)] * (iterations // 4)
+                results[f"{prefix}.search.{name}"] = summarize(time_calls(store.search, calls))
+        finally:
+            store.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    return results
+
+
+STARTUP_CODE = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import benchmarks
+engine = benchmarks.make_engine({workdir!r})
+elapsed = time.perf_counter() - start
+engine.close()
+print(json.dumps(elapsed))
+"""
+
+
+def bench_startup(workdir, runs=10):
+    """Cold start of a fresh interpreter creating a VoiceEngine
+
+    process is the wall time including the interpreter itself; engine is
+    the import and initialization time measured inside the child.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    code = STARTUP_CODE.format(root=root, workdir=workdir)
+    process, engine = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', code], check=True,
+                                capture_output=True, text=True).stdout
+        process.append(time.perf_counter() - start)
+        engine.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'startup.process': summarize(process),
+        'startup.engine': summarize(engine),
+    }
+
+
+def run_benchmarks(suites=SUITES, quick=False, stub_delay=0.0, progress=print):
+    """Run the selected suites in a scratch directory and return the results document"""
+    workdir = tempfile.mkdtemp(prefix='voice-bench-')
+    results = {}
+    try:
+        for suite in suites:
+            progress(f"⏱️ Running {suite} benchmarks...")
+            suite_dir = os.path.join(workdir, suite)
+            os.makedirs(suite_dir)
+            if suite == 'transcribe':
+                results.update(bench_transcribe(suite_dir, files=3 if quick else 5,
+                                                seconds=20.0 if quick else 60.0, delay=stub_delay))
+            elif suite == 'synthesize':
+                results.update(bench_synthesize(suite_dir, iterations=50 if quick else 200,
+                                                delay=stub_delay))
+            elif suite == 'history':
+                results.update(bench_history(suite_dir, QUICK_HISTORY_SIZES if quick else HISTORY_SIZES,
+                                             iterations=100 if quick else 200))
+            elif suite == 'startup':
+                results.update(bench_startup(suite_dir, runs=3 if quick else 10))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': quick,
+            'stub_delay': stub_delay,
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=0.25, min_delta_ms=0.25):
+    """Return a description of every metric that regressed against the baseline
+
+    A latency regresses when it is more than threshold (a fraction) slower
+    and also slower by more than min_delta_ms; throughput regresses when it
+    drops by the same fraction. Tail percentiles are only compared for
+    benchmarks with enough samples (see COMPARED_METRICS).
+    """
+    regressions = []
+    old_results = baseline.get('results', {})
+    for name, new in sorted(results.get('results', {}).items()):
+        old = old_results.get(name)
+        if old is None:
+            continue
+        for metric, (multiplier, min_samples) in COMPARED_METRICS.items():
+            if min(new['n'], old['n']) < min_samples:
+                continue
+            limit = old[metric] * (1 + threshold * multiplier)
+            if new[metric] > limit and new[metric] - old[metric] > min_delta_ms:
+                regressions.append(f"{name} {metric}: {old[metric]:.3f} -> {new[metric]:.3f} ms "
+                                   f"(+{(new[metric] / old[metric] - 1) * 100:.0f}%)")
+        if 'throughput' in new and old.get('throughput'):
+            if new['throughput'] < old['throughput'] / (1 + threshold):
+                regressions.append(f"{name} throughput: {old['throughput']} -> {new['throughput']} "
+                                   f"{new['throughput_unit']}")
+    return regressions
+
+
+def best_of(documents):
+    """Merge several runs into one document keeping each benchmark's run with the lowest median"""
+    merged = dict(documents[0], results={})
+    merged['meta'] = dict(documents[0]['meta'], runs=len(documents))
+    for name in documents[0]['results']:
+        merged['results'][name] = min((document['results'][name] for document in documents),
+                                      key=lambda result: result['p50_ms'])
+    return merged
+
+
+def print_results(document, stream=None):
+    stream = stream or sys.stdout
+    print(f"\n{'benchmark':<38} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}  throughput",
+          file=stream)
+    for name, result in document['results'].items():
+        throughput = f"{result['throughput']} {result['throughput_unit']}" if 'throughput' in result else ''
+        print(f"{name:<38} {result['n']:>6} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+              f"{result['p99_ms']:>10.3f}  {throughput}", file=stream)
+
+
+def main(argv=None):
+    """Command line entry point for `voice-converter bench`"""
+    parser = argparse.ArgumentParser(prog='voice-converter bench',
+                                     description='Run the offline benchmark suite.')
+    parser.add_argument('--only', help=f"comma-separated suites to run ({', '.join(SUITES)})")
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller fixtures and history sizes up to 10^4, for a fast check')
+    parser.add_argument('-o', '--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against results from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown as a fraction before failing (default: 0.25)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.25,
+                        help='ignore latency changes smaller than this (default: 0.25)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='run the suites this many times and keep the best run of each benchmark')
+    parser.add_argument('--stub-delay', type=float, default=0.0,
+                        help='simulated backend latency in seconds (default: 0)')
+    args = parser.parse_args(argv)
+
+    suites = SUITES
+    if args.only:
+        suites = [suite.strip() for suite in args.only.split(',') if suite.strip()]
+        unknown = set(suites) - set(SUITES)
+        if unknown:
+            parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    document = best_of([run_benchmarks(suites, quick=args.quick, stub_delay=args.stub_delay)
+                        for _ in range(max(1, args.repeat))])
+    print_results(document)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(document, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"\n✅ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Hands-free continuous listening
+One input stream stays open for the whole session. A capture thread copies
+microphone chunks into a ring buffer, a segmenter thread splits the stream
+into utterances with an energy-based voice activity detector, and finished
+utterances are recognized on a worker pool while capture continues.
+Transcripts are delivered in the order they were spoken.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import speech_recognition as sr
+
+from audio_io import frame_rms, pcm_to_float
+from metrics import metrics
+
+
+class AudioRingBuffer:
+    """Fixed-size byte ring between the capture and segmenter threads
+
+    If the reader falls behind, the oldest audio is overwritten rather than
+    blocking capture; overruns counts how many bytes were lost that way.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.overruns = 0
+        self._buffer = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def write(self, data):
+        with self._cond:
+            if len(data) > self.capacity:
+                self.overruns += len(data) - self.capacity
+                data = data[-self.capacity:]
+            overflow = self._size + len(data) - self.capacity
+            if overflow > 0:
+                self.overruns += overflow
+                self._start = (self._start + overflow) % self.capacity
+                self._size -= overflow
+            end = (self._start + self._size) % self.capacity
+            first = min(len(data), self.capacity - end)
+            self._buffer[end:end + first] = data[:first]
+            self._buffer[:len(data) - first] = data[first:]
+            self._size += len(data)
+            self._cond.notify()
+
+    def read(self, size, timeout=None):
+        """Return exactly size bytes, or None once closed and drained"""
+        with self._cond:
+            while self._size < size:
+                if self._closed:
+                    return None
+                if not self._cond.wait(timeout):
+                    return None
+            first = min(size, self.capacity - self._start)
+            data = bytes(self._buffer[self._start:self._start + first])
+            data += bytes(self._buffer[:size - first])
+            self._start = (self._start + size) % self.capacity
+            self._size -= size
+            return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class ContinuousListener:
+    """Captures, segments and recognizes speech until stopped"""
+
+    def __init__(self, microphone, recognizer, backend, on_transcript, on_error=None,
+                 noise_tracker=None, workers=4, pause_threshold=0.8, min_speech=0.15,
+                 pre_roll=0.3, max_phrase=15.0, buffer_seconds=10.0):
+        self.microphone = microphone
+        self.recognizer = recognizer        # sr.Recognizer providing energy_threshold
+        self.backend = backend              # RecognizerBackend doing the transcription
+        self.on_transcript = on_transcript
+        self.on_error = on_error
+        self.noise_tracker = noise_tracker
+        self.workers = workers
+        self.pause_threshold = pause_threshold
+        self.min_speech = min_speech
+        self.pre_roll = pre_roll
+        self.max_phrase = max_phrase
+        self.buffer_seconds = buffer_seconds
+
+        self._stop = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='recognizer')
+        self._order_lock = threading.Lock()
+        self._next_seq = 0
+        self._delivered = 0
+        self._finished = {}
+        self._ring = None
+        self._threads = []
+        self._ready = threading.Event()
+        self.started_at = None
+
+    @property
+    def running(self):
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self):
+        """Open the microphone and start listening in the background"""
+        self.started_at = time.time()
+        capture = threading.Thread(target=self._capture, name='listen-capture', daemon=True)
+        self._threads = [capture]
+        capture.start()
+        self._ready.wait(5.0)
+
+    def stop(self, timeout=30.0):
+        """Stop capturing, finish the utterance in progress and wait for transcripts"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._pool.shutdown(wait=True)
+
+    def _capture(self):
+        """Keep one input stream open and copy its audio into the ring buffer"""
+        segmenter = None
+        try:
+            with self.microphone as source:
+                self.sample_rate = source.SAMPLE_RATE
+                self.sample_width = source.SAMPLE_WIDTH
+                self.chunk = source.CHUNK
+                capacity = int(self.buffer_seconds * self.sample_rate) * self.sample_width
+                self._ring = AudioRingBuffer(capacity)
+                segmenter = threading.Thread(target=self._segment, name='listen-vad', daemon=True)
+                self._threads.append(segmenter)
+                segmenter.start()
+                self._ready.set()
+                while not self._stop.is_set():
+                    self._ring.write(source.stream.read(source.CHUNK))
+        except Exception as e:
+            self._ready.set()
+            self._stop.set()
+            if self.on_error:
+                self.on_error(e)
+        finally:
+            if self._ring is not None:
+                self._ring.close()
+            if segmenter is not None:
+                segmenter.join()
+
+    def _segment(self):
+        """Split the captured stream into utterances with energy-based VAD"""
+        chunk_bytes = self.chunk * self.sample_width
+        chunk_seconds = self.chunk / float(self.sample_rate)
+        frame_length = max(1, self.sample_rate // 100)
+        pre_roll = deque(maxlen=max(1, int(self.pre_roll / chunk_seconds)))
+        speech = []
+        voiced_run = 0.0
+        silence_run = 0.0
+        offset = 0.0
+
+        while True:
+            chunk = self._ring.read(chunk_bytes, timeout=0.5)
+            if chunk is None:
+                if self._stop.is_set():
+                    break
+                continue
+            offset += chunk_seconds
+
+            samples = pcm_to_float(chunk, self.sample_width) * 32768.0
+            energy = float(np.median(frame_rms(samples, frame_length)))
+            voiced = energy > self.recognizer.energy_threshold
+
+            if not speech:
+                pre_roll.append(chunk)
+                if voiced:
+                    voiced_run += chunk_seconds
+                else:
+                    voiced_run = 0.0
+                    if self.noise_tracker is not None:
+                        self.noise_tracker.feed(chunk, self.sample_width, self.sample_rate)
+                if voiced_run >= self.min_speech:
+                    # Include the pre-roll so the first syllable is not clipped
+                    speech = list(pre_roll)
+                    start_offset = offset - len(speech) * chunk_seconds
+                    silence_run = 0.0
+                continue
+
+            speech.append(chunk)
+            silence_run = 0.0 if voiced else silence_run + chunk_seconds
+            if silence_run >= self.pause_threshold or len(speech) * chunk_seconds >= self.max_phrase:
+                self._dispatch(b''.join(speech), start_offset)
+                speech = []
+                pre_roll.clear()
+                voiced_run = 0.0
+
+        if speech:
+            self._dispatch(b''.join(speech), start_offset)
+
+    def _dispatch(self, frame_data, offset):
+        """Hand an utterance to the recognizer pool"""
+        seq = self._next_seq
+        self._next_seq += 1
+        self._pool.submit(self._recognize, seq, frame_data, offset)
+
+    def _recognize(self, seq, frame_data, offset):
+        text, error = '', None
+        try:
+            with metrics.span('stt.recognize'):
+                text = self.backend.recognize(frame_data, self.sample_rate, self.sample_width)
+        except Exception as e:
+            error = e
+        self._deliver(seq, offset, text, error)
+
+    def _deliver(self, seq, offset, text, error):
+        """Pass results on in spoken order, holding back any that finish early"""
+        with self._order_lock:
+            self._finished[seq] = (offset, text, error)
+            while self._delivered in self._finished:
+                offset, text, error = self._finished.pop(self._delivered)
+                self._delivered += 1
+                if text:
+                    self.on_transcript(self.started_at + offset, text)
+                elif error is not None and self.on_error and not isinstance(error, sr.UnknownValueError):
+                    self.on_error(error)
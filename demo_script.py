@@ -4,28 +4,24 @@ Demo script for Voice Converter Pro
 This script demonstrates the core functionality without GUI
 """
 
-import pyttsx3
 import speech_recognition as sr
 import time
-from gtts import gTTS
-import os
-import tempfile
-import pygame
+from voice_engine import VoiceEngine
 
-def demo_text_to_speech():
+def demo_text_to_speech(engine):
     """Demonstrate Text-to-Speech functionality"""
     print("=" * 50)
     print("🔊 TEXT-TO-SPEECH DEMO")
     print("=" * 50)
     
-    # Initialize TTS engine
-    engine = pyttsx3.init()
-    
-    # Get available voices
-    voices = engine.getProperty('voices')
+    # Start the TTS engine and get available voices
+    engine.speech_worker.ready.wait()
+    if engine.speech_worker.error is not None:
+        raise engine.speech_worker.error
+    voices = engine.voice_names
     print(f"Available voices: {len(voices)}")
     for i, voice in enumerate(voices[:3]):  # Show first 3 voices
-        print(f"  {i+1}. {voice.name if hasattr(voice, 'name') else f'Voice {i+1}'}")
+        print(f"  {i+1}. {voice}")
     
     # Demo text
     demo_text = "Hello! Welcome to Voice Converter Pro. This is a demonstration of text-to-speech functionality."
@@ -33,26 +29,19 @@ def demo_text_to_speech():
     print(f"\nSpeaking: '{demo_text}'")
     print("🎤 Playing audio...")
     
-    # Configure and speak
-    engine.setProperty('rate', 180)
-    engine.setProperty('volume', 0.9)
-    engine.say(demo_text)
-    engine.runAndWait()
+    # Speak with demo settings, leaving the saved configuration alone
+    engine.speak(demo_text, settings={'rate': 180, 'volume': 0.9}, wait=True)
     
     print("✅ Text-to-Speech demo completed!")
 
-def demo_speech_to_text():
+def demo_speech_to_text(engine):
     """Demonstrate Speech-to-Text functionality"""
     print("\n" + "=" * 50)
     print("🎙️ SPEECH-TO-TEXT DEMO")
     print("=" * 50)
     
-    recognizer = sr.Recognizer()
-    microphone = sr.Microphone()
-    
     print("🎤 Microphone test...")
-    with microphone as source:
-        recognizer.adjust_for_ambient_noise(source)
+    engine.test_microphone()
     print("✅ Microphone ready!")
     
     print("\n🔴 Recording in 3 seconds...")
@@ -63,19 +52,14 @@ def demo_speech_to_text():
     print("🎙️ Speak now! (You have 5 seconds)")
     
     try:
-        with microphone as source:
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=5)
-        
-        print("🔄 Processing speech...")
-        text = recognizer.recognize_google(audio)
+        text = engine.listen(timeout=5, phrase_time_limit=5,
+                             on_processing=lambda: print("🔄 Processing speech..."))
         
         print(f"✅ Recognized: '{text}'")
         
         # Convert recognized text back to speech
         print("🔄 Converting back to speech...")
-        engine = pyttsx3.init()
-        engine.say(f"You said: {text}")
-        engine.runAndWait()
+        engine.speak(f"You said: {text}", wait=True)
         
     except sr.WaitTimeoutError:
         print("❌ No speech detected within timeout period")
@@ -86,37 +70,36 @@ def demo_speech_to_text():
     except Exception as e:
         print(f"❌ Error: {e}")
 
-def demo_google_tts():
-    """Demonstrate Google TTS with file saving"""
+def demo_google_tts(engine):
+    """Demonstrate Google TTS with gapless in-memory playback"""
     print("\n" + "=" * 50)
     print("🌐 GOOGLE TTS DEMO")
     print("=" * 50)
     
-    text = "This is a demonstration of Google Text-to-Speech with file saving capability."
+    phrases = [
+        "This is a demonstration of Google Text-to-Speech.",
+        "Each phrase is played straight from memory,",
+        "queued back to back with no gaps in between.",
+    ]
     
     try:
-        print(f"Converting: '{text}'")
-        tts = gTTS(text=text, lang='en', slow=False)
-        
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
-            temp_filename = temp_file.name
-            tts.save(temp_filename)
+        cache = engine.speech_cache
+        clips = []
+        for text in phrases:
+            print(f"Converting: '{text}'")
+            hits = cache.hits
+            start = time.perf_counter()
+            audio = engine.synthesize(text)
+            source = "cache" if cache.hits > hits else "Google TTS"
+            print(f"⚡ Synthesized in {time.perf_counter() - start:.3f}s (from {source})")
+            clips.append(audio)
         
-        print(f"✅ Audio saved to: {temp_filename}")
-        
-        # Play the saved audio
-        print("🎵 Playing saved audio...")
-        pygame.mixer.init()
-        pygame.mixer.music.load(temp_filename)
-        pygame.mixer.music.play()
-        
-        # Wait for playback to complete
-        while pygame.mixer.music.get_busy():
-            time.sleep(0.1)
-        
-        # Clean up
-        os.unlink(temp_filename)
+        # Queue every phrase at once; the player chains them on the mixer
+        print("🎵 Playing from memory...")
+        player = engine.speech_player
+        for i, audio in enumerate(clips, 1):
+            last = player.enqueue(audio, on_start=lambda clip, i=i: print(f"   ▶️ Phrase {i} ({clip.length:.1f}s)"))
+        last.wait()
         print("✅ Google TTS demo completed!")
         
     except Exception as e:
@@ -152,20 +135,24 @@ def main():
     print("A comprehensive TTS & STT application")
     print("Showcasing Python skills for your portfolio!")
     
+    engine = None
     try:
         # Feature showcase
         demo_features()
         
+        # The same engine core that drives the GUI
+        engine = VoiceEngine()
+        
         # TTS Demo
-        demo_text_to_speech()
+        demo_text_to_speech(engine)
         
         # Google TTS Demo
-        demo_google_tts()
+        demo_google_tts(engine)
         
         # STT Demo (optional - requires microphone)
         response = input("\n🎙️ Do you want to test Speech-to-Text? (y/n): ").lower().strip()
         if response == 'y':
-            demo_speech_to_text()
+            demo_speech_to_text(engine)
         else:
             print("⏭️ Skipping Speech-to-Text demo")
         
@@ -182,6 +169,9 @@ def main():
         print(f"\n❌ Demo error: {e}")
         print("Make sure all dependencies are installed:")
         print("pip install -r requirements.txt")
+    finally:
+        if engine is not None:
+            engine.close()
 
 if __name__ == "__main__":
     main()
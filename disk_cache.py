@@ -0,0 +1,147 @@
+"""
+Size-capped, content-addressed on-disk cache
+Entries are stored as one file per key, written atomically, and evicted in
+least-recently-used order once the total size exceeds the cap.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def make_key(**fields):
+    """Hash a set of fields into a stable cache key"""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """LRU cache of byte blobs stored as files in a directory"""
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (filename, size), oldest first
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the LRU index from the files already on disk"""
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name, stat.st_size))
+        for _mtime, filename, size in sorted(found):
+            key = os.path.splitext(filename)[0]
+            self._entries[key] = (filename, size)
+            self._total += size
+
+    def path(self, key):
+        """Return the file path of a cached entry, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        filepath = os.path.join(self.directory, entry[0])
+        try:
+            # The mtime records recency for the next process that scans the cache
+            os.utime(filepath)
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+        return filepath
+
+    def get(self, key):
+        """Return the cached bytes for a key, or None on a miss"""
+        filepath = self.path(key)
+        if filepath is None:
+            return None
+        try:
+            with open(filepath, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+
+    def put(self, key, data, suffix=''):
+        """Store bytes under a key and return the path of the cached file"""
+        filename = key + suffix
+        filepath = os.path.join(self.directory, filename)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, filepath)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._total -= old[1]
+            self._entries[key] = (filename, len(data))
+            self._total += len(data)
+            evicted = self._evict()
+
+        for name in evicted:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+        return filepath
+
+    def _evict(self):
+        """Drop least recently used entries until under the size cap"""
+        evicted = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            _key, (filename, size) = self._entries.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            evicted.append(filename)
+        return evicted
+
+    def _forget(self, key):
+        """Remove an entry whose file disappeared behind our back"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self._total -= entry[1]
+
+    def clear(self):
+        """Delete every cached entry"""
+        with self._lock:
+            filenames = [filename for filename, _size in self._entries.values()]
+            self._entries.clear()
+            self._total = 0
+        for filename in filenames:
+            try:
+                os.unlink(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
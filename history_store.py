@@ -0,0 +1,269 @@
+"""
+Append-only history store backed by SQLite
+Entries are inserted one row at a time (no whole-file rewrites) and indexed
+by time and type, so appends stay O(1) and queries stay fast however large
+the history grows. Full, untruncated text is kept, and an FTS5 inverted
+index maintained by triggers provides full-text search with phrase and
+prefix queries.
+
+Usage: voice-converter search <query> [--type TTS] [--since YYYY-MM-DD]
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS history_type_timestamp ON history (type, timestamp);
+CREATE INDEX IF NOT EXISTS history_type_id ON history (type, id);
+"""
+
+# Inverted index over history text, kept in sync by triggers on every write
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE history_fts USING fts5(
+    text, content='history', content_rowid='id', tokenize='unicode61', prefix='2 3 4'
+);
+CREATE TRIGGER history_fts_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER history_fts_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts (history_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+INSERT INTO history_fts (history_fts) VALUES ('rebuild');
+"""
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"?|(\S+)')
+
+# Retention is enforced every this many appends rather than on each one
+PRUNE_INTERVAL = 1000
+
+
+class HistoryStore:
+    """Thread-safe SQLite store of TTS/STT history entries"""
+
+    def __init__(self, path='voice_history.db', retention_days=None, max_entries=None):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._appends = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            has_index = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'history_fts'").fetchone()
+            if not has_index:
+                self._conn.executescript(SEARCH_SCHEMA)
+        self.prune()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, type_str, text, timestamp=None):
+        """Append one entry and return it as a dict"""
+        timestamp = timestamp or datetime.now().isoformat()
+        with metrics.span('history.add'), self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO history (timestamp, type, text) VALUES (?, ?, ?)',
+                (timestamp, type_str, text))
+            self._appends += 1
+        if self._appends % PRUNE_INTERVAL == 0:
+            self.prune()
+        return {'id': cursor.lastrowid, 'timestamp': timestamp, 'type': type_str, 'text': text}
+
+    def add_many(self, entries):
+        """Append a batch of entry dicts in one transaction"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO history (timestamp, type, text) VALUES (?, ?, ?)',
+                ((entry['timestamp'], entry['type'], entry['text']) for entry in entries))
+
+    def query(self, start=None, end=None, types=None, before_id=None, limit=100):
+        """Return entries newest first, filtered by time range and type
+
+        Pass the id of the last entry of one page as before_id to get the next.
+        """
+        clauses, params = self._filters(start, end, types)
+        if before_id is not None:
+            clauses.append('id < ?')
+            params.append(before_id)
+        sql = 'SELECT id, timestamp, type, text FROM history'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with metrics.span('history.query'), self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def search(self, query, start=None, end=None, types=None, before_id=None, limit=100):
+        """Full-text search, newest first, with the same filters and paging as query()
+
+        Words must all match; "quoted words" match as a phrase and a trailing *
+        matches as a prefix.
+        """
+        expression = build_match_expression(query)
+        if not expression:
+            return []
+        clauses, params = self._filters(start, end, types, table='h.')
+        clauses.insert(0, 'history_fts MATCH ?')
+        params.insert(0, expression)
+        if before_id is not None:
+            clauses.append('h.id < ?')
+            params.append(before_id)
+        sql = ('SELECT h.id, h.timestamp, h.type, h.text FROM history_fts '
+               'JOIN history h ON h.id = history_fts.rowid WHERE ' + ' AND '.join(clauses) +
+               ' ORDER BY history_fts.rowid DESC')
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with metrics.span('history.search'), self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def count(self, start=None, end=None, types=None):
+        """Return the number of entries matching the filters"""
+        clauses, params = self._filters(start, end, types)
+        sql = 'SELECT COUNT(*) FROM history'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def types(self):
+        """Return the distinct entry types"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT DISTINCT type FROM history ORDER BY type')]
+
+    def iter_entries(self, batch_size=1000):
+        """Yield every entry oldest first without loading them all at once"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT id, timestamp, type, text FROM history WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]['id']
+
+    def clear(self):
+        """Delete all entries"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM history')
+
+    def prune(self):
+        """Drop entries outside the retention window or beyond the entry cap"""
+        with self._lock, self._conn:
+            if self.retention_days:
+                cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+                self._conn.execute('DELETE FROM history WHERE timestamp < ?', (cutoff,))
+            if self.max_entries:
+                self._conn.execute(
+                    'DELETE FROM history WHERE id <= '
+                    '(SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                    (self.max_entries,))
+
+    def import_json(self, json_path):
+        """One-time migration from the old voice_history.json format
+
+        The file is renamed to <name>.migrated afterwards, so entries removed
+        with clear() do not come back on the next start.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        imported = 0
+        if not self.count():
+            with open(json_path, 'r') as f:
+                entries = json.load(f)
+            self.add_many(entries)
+            imported = len(entries)
+        os.replace(json_path, json_path + '.migrated')
+        return imported
+
+    @staticmethod
+    def _filters(start, end, types, table=''):
+        """Build WHERE clauses for the indexed time and type filters"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f'{table}timestamp >= ?')
+            params.append(start.isoformat() if isinstance(start, datetime) else start)
+        if end is not None:
+            clauses.append(f'{table}timestamp < ?')
+            params.append(end.isoformat() if isinstance(end, datetime) else end)
+        if types:
+            clauses.append(f'{table}type IN (%s)' % ', '.join('?' * len(types)))
+            params.extend(types)
+        return clauses, params
+
+
+def build_match_expression(query):
+    """Translate a user search string into a safe FTS5 MATCH expression"""
+    terms = []
+    for phrase, word in _QUERY_TOKEN.findall(query):
+        if phrase.strip():
+            terms.append('"%s"' % phrase.strip().replace('"', '""'))
+        elif word:
+            prefix = word.endswith('*')
+            word = word.rstrip('*').replace('"', '""')
+            if word:
+                terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms)
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD[THH:MM] command line or UI date"""
+    return datetime.fromisoformat(value) if value else None
+
+
+def main(argv=None):
+    """Command line entry point for `voice-converter search`"""
+    parser = argparse.ArgumentParser(prog='voice-converter search',
+                                     description='Search TTS and STT history.')
+    parser.add_argument('query', help='words to find; "quote" phrases, end a word with * for prefixes')
+    parser.add_argument('--db', default='voice_history.db', help='history database')
+    parser.add_argument('--type', action='append', dest='types', help='only this entry type (repeatable)')
+    parser.add_argument('--since', type=parse_date, help='only entries on or after this date')
+    parser.add_argument('--until', type=parse_date, help='only entries before this date')
+    parser.add_argument('-n', '--limit', type=int, default=20, help='maximum results (default: 20)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    try:
+        results = store.search(args.query, start=args.since, end=args.until,
+                               types=args.types, limit=args.limit)
+    finally:
+        store.close()
+
+    for entry in results:
+        if args.json:
+            print(json.dumps(entry))
+        else:
+            timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"[{timestamp}] {entry['type']}: {entry['text']}")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
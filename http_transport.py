@@ -0,0 +1,328 @@
+"""
+Shared HTTP transport for the remote speech engines
+Google recognition and Google TTS requests go through one HTTPTransport that
+keeps connections open between requests (no TCP/TLS handshake per call),
+applies connect and read timeouts, retries transient failures with jittered
+exponential backoff and trips a per-host circuit breaker after repeated
+failures, so callers can fail over to a local backend without waiting.
+"""
+
+import http.client
+import random
+import ssl
+import threading
+import time
+import urllib.request
+from collections import deque
+from urllib.parse import urlsplit
+
+from metrics import metrics
+
+# Statuses worth retrying: rate limiting and server-side failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TransportError(Exception):
+    """A request failed; status is the HTTP status, or None when no response arrived"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(TransportError):
+    """Raised without sending anything while a host's circuit breaker is open"""
+
+
+class Response:
+    """A fully read HTTP response; headers is case-insensitive"""
+
+    __slots__ = ('status', 'reason', 'headers', 'body')
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def text(self, encoding='utf-8'):
+        return self.body.decode(encoding)
+
+
+class CircuitBreaker:
+    """Stops sending requests to a host that keeps failing
+
+    'closed': requests flow; failure_threshold failures in a row open it.
+    'open': requests fail at once until reset_timeout seconds have passed.
+    'half-open': one trial request is let through; success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self.clock() - self._opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def retry_after(self):
+        """Seconds until the next trial request is allowed (0 when closed)"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - self.clock())
+
+    def allow(self):
+        """Return True if a request may be sent now"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial:
+                    self.trips += 1
+                self._opened_at = self.clock()
+                self._trial = False
+
+
+class HTTPTransport:
+    """Keep-alive connection pool with timeouts, retries and circuit breakers
+
+    Up to max_idle open connections are kept per host and reused. A request
+    is attempted up to retries + 1 times; connection errors, timeouts and
+    RETRY_STATUSES are retried after a random delay of up to
+    backoff * 2 ** attempt seconds (capped at max_backoff, or the server's
+    Retry-After). Every failed attempt counts towards the host's breaker.
+    Proxies from the environment are honoured like urllib does.
+    """
+
+    def __init__(self, connect_timeout=5.0, read_timeout=15.0, retries=2, backoff=0.5,
+                 max_backoff=8.0, max_idle=4, failure_threshold=5, reset_timeout=30.0,
+                 verify=True):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_idle = max_idle
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.ssl_context = ssl.create_default_context()
+        if not verify:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.stats = {'requests': 0, 'attempts': 0, 'retries': 0, 'failures': 0,
+                      'connections': 0, 'reused': 0, 'rejected': 0}
+        self._idle = {}        # (scheme, host, port) -> deque of idle connections
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url):
+        """Circuit breaker of the host serving url"""
+        origin = self._origin(urlsplit(url))
+        with self._lock:
+            if origin not in self._breakers:
+                self._breakers[origin] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[origin]
+
+    def available(self, url):
+        """False while the breaker for url's host is open"""
+        return self.breaker(url).state != 'open'
+
+    def request(self, method, url, body=None, headers=None, retries=None):
+        """Send a request and return the Response
+
+        Raises TransportError when the server answers with an error status or
+        every attempt failed, and CircuitOpenError while the host is being
+        avoided.
+        """
+        parts = urlsplit(url)
+        origin = self._origin(parts)
+        breaker = self.breaker(url)
+        retries = self.retries if retries is None else retries
+        self._count('requests')
+
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                self._count('rejected')
+                raise CircuitOpenError(f"{parts.hostname} is unavailable after repeated failures; "
+                                       f"retrying in {breaker.retry_after():.0f}s")
+            if attempt:
+                self._count('retries')
+            self._count('attempts')
+            start = time.perf_counter()
+            try:
+                response = self._send(origin, parts, method, body, headers or {})
+            except (OSError, http.client.HTTPException) as e:
+                error = TransportError(f"{type(e).__name__}: {e}" if str(e) else type(e).__name__)
+                delay = None
+            else:
+                if response.status < 400:
+                    metrics.observe('http.request', time.perf_counter() - start)
+                    breaker.record_success()
+                    return response
+                error = TransportError(f"HTTP {response.status} {response.reason}", response.status)
+                if response.status not in RETRY_STATUSES:
+                    # The host is up and answered; retrying would get the same answer
+                    metrics.observe('http.request', time.perf_counter() - start, error=True)
+                    breaker.record_success()
+                    raise error
+                delay = self._retry_after(response)
+
+            metrics.observe('http.request', time.perf_counter() - start, error=True)
+            self._count('failures')
+            breaker.record_failure()
+            if attempt < retries:
+                cap = min(self.max_backoff, self.backoff * 2 ** attempt)
+                time.sleep(min(delay, self.max_backoff) if delay is not None else random.uniform(0, cap))
+        raise error
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for pool in pools.values():
+            for connection in pool:
+                connection.close()
+
+    def _send(self, origin, parts, method, body, headers):
+        """One attempt over a pooled connection, reconnecting once if it went stale"""
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        for reused, connection in self._connections(origin):
+            try:
+                if connection.sock is None:
+                    connection.connect()
+                    connection.sock.settimeout(self.read_timeout)
+                connection.request(method, connection.url_prefix + path, body=body, headers=headers)
+                raw = connection.getresponse()
+                response = Response(raw.status, raw.reason, raw.headers, raw.read())
+            except (ConnectionError, http.client.BadStatusLine):
+                connection.close()
+                if reused:
+                    # The server closed the idle connection; try a fresh one
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            if raw.will_close:
+                connection.close()
+            else:
+                self._release(origin, connection)
+            return response
+
+    def _connections(self, origin):
+        """Yield (reused, connection): an idle pooled one if any, then a new one"""
+        with self._lock:
+            pool = self._idle.get(origin)
+            connection = pool.pop() if pool else None
+        if connection is not None:
+            self._count('reused')
+            yield True, connection
+        self._count('connections')
+        yield False, self._connect(origin)
+
+    def _connect(self, origin):
+        scheme, host, port = origin
+        proxy = None
+        if not urllib.request.proxy_bypass(host):
+            proxy = urllib.request.getproxies().get(scheme)
+        if proxy:
+            proxy = urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+            connect_host, connect_port = proxy.hostname, proxy.port or 80
+        else:
+            connect_host, connect_port = host, port
+
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(connect_host, connect_port,
+                                                     timeout=self.connect_timeout,
+                                                     context=self.ssl_context)
+            if proxy:
+                connection.set_tunnel(host, port)
+            connection.url_prefix = ''
+        else:
+            connection = http.client.HTTPConnection(connect_host, connect_port,
+                                                    timeout=self.connect_timeout)
+            # Plain HTTP proxies take the absolute URL in the request line
+            connection.url_prefix = f"http://{host}:{port}" if proxy else ''
+        return connection
+
+    def _release(self, origin, connection):
+        with self._lock:
+            pool = self._idle.setdefault(origin, deque())
+            if len(pool) < self.max_idle:
+                pool.append(connection)
+                return
+        connection.close()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _origin(parts):
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+        return scheme, parts.hostname, parts.port or (443 if scheme == 'https' else 80)
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return max(0.0, float(response.headers.get('Retry-After', '')))
+        except ValueError:
+            return None
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport():
+    """The process-wide transport used by the remote backends"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HTTPTransport()
+        return _shared
+
+
+def configure_transport(**options):
+    """Replace the shared transport with one built from options (see HTTPTransport)"""
+    global _shared
+    with _shared_lock:
+        previous, _shared = _shared, HTTPTransport(**options)
+    if previous is not None:
+        previous.close()
+    return _shared
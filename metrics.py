@@ -0,0 +1,150 @@
+"""
+Per-stage latency metrics for Voice Converter Pro
+Every stage of the TTS and STT paths (microphone open, calibration, listen,
+recognition round trip, synthesis, playback, history writes...) is timed
+with metrics.span(stage) and kept in an in-process histogram. The
+histograms can be exported as Prometheus text or JSON, served at /metrics
+by `voice-converter serve`, and are shown live in the Settings tab.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from local work (~1 ms) to slow network round trips
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Recent samples kept per stage for percentiles
+RECENT_SAMPLES = 1024
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Percentiles of the recent samples in milliseconds"""
+        if not self.recent:
+            return {f"p{point}_ms": None for point in points}
+        import numpy as np
+        values = np.percentile(np.fromiter(self.recent, dtype=np.float64), points) * 1000.0
+        return {f"p{point}_ms": round(float(value), 3) for point, value in zip(points, values)}
+
+
+class MetricsRegistry:
+    """Thread-safe collection of per-stage latency histograms"""
+
+    def __init__(self, prefix='voice'):
+        self.prefix = prefix
+        self.started = time.time()
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage, seconds, error=False):
+        """Record one duration for a stage"""
+        with self._lock:
+            histogram = self._histogram(stage)
+            histogram.observe(seconds)
+            if error:
+                histogram.errors += 1
+
+    @contextmanager
+    def span(self, stage):
+        """Time a block of work as one observation of stage; exceptions count as errors"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(stage, time.perf_counter() - start, error=True)
+            raise
+        self.observe(stage, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """Per-stage count, error count, mean and recent percentiles"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in sorted(self._histograms.items()):
+                stats = {
+                    'count': histogram.count,
+                    'errors': histogram.errors,
+                    'mean_ms': round(histogram.sum / histogram.count * 1000.0, 3),
+                }
+                stats.update(histogram.percentiles())
+                stages[stage] = stats
+            return stages
+
+    def as_dict(self):
+        with self._lock:
+            buckets = {stage: {'le': list(histogram.buckets) + ['+Inf'], 'counts': list(histogram.counts),
+                               'sum': histogram.sum}
+                       for stage, histogram in self._histograms.items()}
+        stages = self.snapshot()
+        for stage, stats in stages.items():
+            stats['histogram'] = buckets[stage]
+        return {'since': self.started, 'stages': stages}
+
+    def prometheus_text(self):
+        """Render the histograms in the Prometheus text exposition format"""
+        name = f"{self.prefix}_stage_seconds"
+        errors = f"{self.prefix}_stage_errors_total"
+        lines = [
+            f"# HELP {name} Latency of each TTS/STT stage in seconds",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            for stage, histogram in histograms:
+                label = f'stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{{label}}} {histogram.count}')
+            lines.append(f"# HELP {errors} Stage runs that raised an exception")
+            lines.append(f"# TYPE {errors} counter")
+            for stage, histogram in histograms:
+                lines.append(f'{errors}{{stage="{stage}"}} {histogram.errors}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the metrics to path as JSON (.json) or Prometheus text (anything else)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.lower().endswith('.json'):
+                json.dump(self.as_dict(), f, indent=2)
+            else:
+                f.write(self.prometheus_text())
+
+
+metrics = MetricsRegistry()
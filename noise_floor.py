@@ -0,0 +1,174 @@
+"""
+Continuous background noise-floor tracking
+Instead of calibrating with adjust_for_ambient_noise() before every listen,
+a background thread reads the microphone while it is idle and keeps the
+recognizer's energy_threshold current from a rolling window of frame
+energies. The calibrated threshold is persisted per input device so the
+next session can start recording instantly.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from audio_io import frame_rms, pcm_to_float
+
+# Never let the threshold fall so low that hiss counts as speech
+MIN_ENERGY_THRESHOLD = 50
+SAVE_INTERVAL = 30.0
+
+
+def device_name(microphone):
+    """Return a stable name for the input device behind a sr.Microphone"""
+    try:
+        audio = microphone.pyaudio_module.PyAudio()
+        try:
+            if microphone.device_index is None:
+                info = audio.get_default_input_device_info()
+            else:
+                info = audio.get_device_info_by_index(microphone.device_index)
+            return info['name']
+        finally:
+            audio.terminate()
+    except Exception:
+        return 'default'
+
+
+class NoiseFloorTracker:
+    """Keeps a speech_recognition Recognizer's energy_threshold up to date"""
+
+    def __init__(self, recognizer, microphone=None, device='default',
+                 store_file='voice_noise_floor.json', window=5.0, percentile=20, frame_ms=30):
+        self.recognizer = recognizer
+        self.microphone = microphone
+        self.device = device
+        self.store_file = store_file
+        self.percentile = percentile
+        self.frame_ms = frame_ms
+        self.noise_floor = None
+        self.threshold = None
+        self.error = None
+        self._levels = deque(maxlen=max(1, int(window * 1000 / frame_ms)))
+        self._lock = threading.Lock()
+        # Makes pause() and the thread taking the microphone mutually exclusive
+        self._state_lock = threading.Lock()
+        self._active = threading.Event()
+        self._released = threading.Event()
+        self._released.set()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._last_save = time.monotonic()
+
+        threshold = self._load()
+        if threshold:
+            self.set_threshold(threshold)
+
+    @property
+    def calibrated(self):
+        return self.threshold is not None
+
+    def set_threshold(self, threshold):
+        """Use a known threshold, e.g. from a one-off calibration"""
+        with self._lock:
+            self.threshold = max(MIN_ENERGY_THRESHOLD, float(threshold))
+            self.recognizer.energy_threshold = self.threshold
+
+    def feed(self, frame_data, sample_width=2, sample_rate=16000):
+        """Add raw microphone audio to the rolling window and update the threshold"""
+        samples = pcm_to_float(frame_data, sample_width) * 32768.0
+        levels = frame_rms(samples, max(1, sample_rate * self.frame_ms // 1000))
+        if not len(levels):
+            return
+        with self._lock:
+            self._levels.extend(levels.tolist())
+            # A low percentile tracks the background, ignoring bursts of speech
+            self.noise_floor = float(np.percentile(np.fromiter(self._levels, dtype=np.float32),
+                                                   self.percentile))
+            self.threshold = max(MIN_ENERGY_THRESHOLD,
+                                 self.noise_floor * self.recognizer.dynamic_energy_ratio)
+            self.recognizer.energy_threshold = self.threshold
+
+    def start(self):
+        """Start tracking in the background"""
+        if self._thread is None:
+            self._active.set()
+            self._thread = threading.Thread(target=self._run, name='noise-floor', daemon=True)
+            self._thread.start()
+
+    def pause(self, timeout=1.0):
+        """Release the microphone so a recording can open it"""
+        with self._state_lock:
+            self._active.clear()
+        self._released.wait(timeout)
+
+    def resume(self):
+        """Go back to tracking after a recording"""
+        self.save()
+        self._active.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._active.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+        self.save()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._active.wait()
+            if self._stopped.is_set():
+                break
+            # Claim the microphone only if no pause() got in first; otherwise
+            # pause() could see _released still set and return while we open it
+            with self._state_lock:
+                if not self._active.is_set():
+                    continue
+                self._released.clear()
+            try:
+                with self.microphone as source:
+                    while self._active.is_set() and not self._stopped.is_set():
+                        data = source.stream.read(source.CHUNK)
+                        self.feed(data, source.SAMPLE_WIDTH, source.SAMPLE_RATE)
+                        if time.monotonic() - self._last_save > SAVE_INTERVAL:
+                            self.save()
+                self.error = None
+            except Exception as e:
+                # Device busy or unplugged; try again shortly
+                self.error = e
+            finally:
+                self._released.set()
+            if self.error is not None:
+                self._stopped.wait(5.0)
+
+    def _load(self):
+        """Return the persisted threshold for this device, if any"""
+        try:
+            with open(self.store_file, 'r') as f:
+                return json.load(f).get(self.device, {}).get('energy_threshold')
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self):
+        """Persist the current threshold for this device"""
+        self._last_save = time.monotonic()
+        if self.threshold is None:
+            return
+        try:
+            with open(self.store_file, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data[self.device] = {
+            'energy_threshold': round(self.threshold, 1),
+            'noise_floor': round(self.noise_floor, 1) if self.noise_floor is not None else None,
+            'updated': datetime.now().isoformat(),
+        }
+        temp_file = self.store_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_file, self.store_file)
@@ -0,0 +1,179 @@
+"""
+Live partial transcripts while a phrase is being recorded
+PartialTranscriber taps the microphone stream that speech_recognition's
+listen() reads from, so it sees every chunk as it is captured. Once the
+chunks get louder than the recognizer's energy threshold it collects the
+phrase and, every interval seconds, reports a hypothesis: backends that can
+decode incrementally (Vosk) are fed the new audio, others re-recognize the
+whole phrase so far, one request at a time. The final transcript still
+comes from the utterance listen() returns. PhraseStopper uses the same tap
+to let the user end a phrase early.
+"""
+
+import threading
+import time
+from collections import deque
+
+from audio_io import frame_rms, pcm_to_float
+from metrics import metrics
+
+
+class StreamTap:
+    """Audio source stream wrapper that also passes every chunk read to a callback"""
+
+    def __init__(self, stream, on_chunk):
+        self.stream = stream
+        self.on_chunk = on_chunk
+
+    def read(self, size):
+        data = self.stream.read(size)
+        if data:
+            self.on_chunk(data)
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+def _loud(chunk, sample_width, threshold):
+    """True when a chunk's RMS energy is above the recognizer's threshold"""
+    samples = pcm_to_float(chunk, sample_width) * float(1 << (8 * sample_width - 1))
+    return float(frame_rms(samples, len(samples))[0]) > threshold
+
+
+class PhraseStopper:
+    """Context manager letting another thread end the phrase recognizer.listen() is recording
+
+    Once stopped is set the source reads as silence, so listen() closes the
+    phrase after its pause_threshold and returns the audio captured so far.
+    If no speech was heard yet, the next read raises WaitTimeoutError.
+    """
+
+    def __init__(self, source, recognizer, stopped):
+        self.source = source
+        self.recognizer = recognizer
+        self.stopped = stopped              # threading.Event
+        self.stream = None
+        self.heard = False
+
+    def __enter__(self):
+        self.stream = self.source.stream
+        self.source.stream = self
+        return self
+
+    def __exit__(self, *exc_info):
+        self.source.stream = self.stream
+
+    def read(self, size):
+        width = self.source.SAMPLE_WIDTH
+        if self.stopped.is_set():
+            if not self.heard:
+                import speech_recognition as sr
+                raise sr.WaitTimeoutError("Recording stopped before any speech was heard")
+            return bytes(size * width)
+        data = self.stream.read(size)
+        if not self.heard and _loud(data, width, self.recognizer.energy_threshold):
+            self.heard = True
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+class PartialTranscriber:
+    """Context manager reporting partial hypotheses for the phrase being recorded
+
+    Use it around recognizer.listen(source): on_partial(text) is called from
+    a worker thread whenever the hypothesis changes, and never after the
+    block has been left.
+    """
+
+    def __init__(self, backend, source, recognizer, on_partial, interval=0.3, pre_roll=0.5):
+        self.backend = backend
+        self.source = source
+        self.recognizer = recognizer        # sr.Recognizer providing energy_threshold
+        self.on_partial = on_partial
+        self.interval = interval
+        self.sample_rate = source.SAMPLE_RATE
+        self.sample_width = source.SAMPLE_WIDTH
+        chunk_seconds = source.CHUNK / float(source.SAMPLE_RATE)
+        self._pre_roll = deque(maxlen=max(1, int(pre_roll / chunk_seconds)))
+        self._phrase = bytearray()
+        self._speech_started = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._emit_lock = threading.Lock()
+        self._thread = None
+        self.partials = 0
+
+    def __enter__(self):
+        self.source.stream = StreamTap(self.source.stream, self.feed)
+        self._thread = threading.Thread(target=self._run, name='stt-partial', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.source.stream = self.source.stream.stream
+        with self._emit_lock:
+            with self._cond:
+                self._closed = True
+                self._cond.notify()
+        # A request in flight is not waited for; its result is dropped
+
+    def feed(self, chunk):
+        """Take one captured chunk; runs on the capture thread, so it only buffers"""
+        with self._cond:
+            if self._speech_started is None:
+                self._pre_roll.append(chunk)
+                if not _loud(chunk, self.sample_width, self.recognizer.energy_threshold):
+                    return
+                self._speech_started = time.perf_counter()
+                self._phrase += b''.join(self._pre_roll)
+            else:
+                self._phrase += chunk
+            self._cond.notify()
+
+    def _run(self):
+        stream = None
+        sent = 0
+        next_pass = 0.0
+        last_text = ''
+        while True:
+            with self._cond:
+                while not self._closed:
+                    wait = None
+                    if len(self._phrase) > sent:
+                        wait = next_pass - time.monotonic()
+                        if wait <= 0:
+                            break
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+                phrase = bytes(self._phrase)
+            next_pass = time.monotonic() + self.interval
+
+            start = time.perf_counter()
+            try:
+                if sent == 0:
+                    stream = self.backend.open_stream(self.sample_rate, self.sample_width)
+                if stream is not None:
+                    text = stream.feed(phrase[sent:])
+                else:
+                    text = self.backend.recognize(phrase, self.sample_rate, self.sample_width)
+            except Exception:
+                # Mostly "no speech yet" at the start of a phrase; the final result reports real errors
+                text = ''
+            sent = len(phrase)
+            metrics.observe('stt.partial', time.perf_counter() - start)
+            if text and text != last_text:
+                last_text = text
+                self._emit(text)
+
+    def _emit(self, text):
+        with self._emit_lock:
+            if self._closed:
+                return
+            if self.partials == 0:
+                metrics.observe('stt.first_partial', time.perf_counter() - self._speech_started)
+            self.partials += 1
+            self.on_partial(text)
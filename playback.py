@@ -0,0 +1,261 @@
+"""
+In-memory, event-driven audio playback
+Clips are decoded straight from bytes into pygame Sounds (no temp files) and
+played in order on one reserved mixer channel. The clip after the current one
+is handed to Channel.queue(), so the mixer starts it sample-accurately with no
+gap. A driver thread sleeps until the current clip is due to end instead of
+polling get_busy(), then fires the clip's events and callbacks.
+"""
+
+import io
+import threading
+import time
+import traceback
+from collections import deque
+
+from metrics import metrics
+
+# Re-check interval when the mixer runs slightly behind the clock at a clip boundary
+BOUNDARY_SLACK = 0.005
+
+# Give up waiting for the mixer to confirm the end of a clip after this long
+MAX_OVERRUN = 0.25
+
+
+class Clip:
+    """One audio clip queued on an AudioPlayer
+
+    status goes from 'queued' to 'playing' to 'done' or 'stopped'. started is
+    set when the clip begins playing (or is dropped), finished when it ends.
+    """
+
+    def __init__(self, sound, on_start=None, on_done=None):
+        self.sound = sound
+        self.length = sound.get_length()
+        self.on_start = on_start
+        self.on_done = on_done
+        self.status = 'queued'
+        self.offset = 0.0        # seconds into the clip where playback last (re)started
+        self.started_at = None
+        self.started = threading.Event()
+        self.finished = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the clip ends; return True if it played to the end"""
+        self.finished.wait(timeout)
+        return self.status == 'done'
+
+
+class AudioPlayer:
+    """Gapless queued playback of in-memory clips on a pygame mixer channel
+
+    pygame and its mixer are only loaded on first use (or by warm_up()).
+    Callbacks run on the player's driver thread.
+    """
+
+    def __init__(self):
+        self._pygame = None
+        self._init_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._channel = None
+        self._queue = deque()   # clips not yet handed to the mixer
+        self._current = None
+        self._chained = None    # next clip, already queued on the channel
+        self._resumed_at = 0.0  # perf_counter when the current clip last (re)started
+        self._paused = False
+
+    def warm_up(self):
+        """Import pygame, open the audio device and start the driver thread"""
+        with self._init_lock:
+            if self._pygame is None:
+                import pygame
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init()
+                pygame.mixer.set_reserved(1)
+                self._channel = pygame.mixer.Channel(0)
+                self._pygame = pygame
+                threading.Thread(target=self._run, name='playback', daemon=True).start()
+        return self._pygame
+
+    @property
+    def busy(self):
+        """True while a clip is playing or paused"""
+        with self._cond:
+            return self._current is not None
+
+    @property
+    def queue_depth(self):
+        """Number of clips waiting behind the current one"""
+        with self._cond:
+            return len(self._queue) + (self._chained is not None)
+
+    @property
+    def paused(self):
+        with self._cond:
+            return self._paused
+
+    @property
+    def position(self):
+        """Seconds into the current clip, or 0.0 when idle"""
+        with self._cond:
+            return self._position()
+
+    def enqueue(self, data, on_start=None, on_done=None):
+        """Queue an audio clip (WAV, MP3 or OGG bytes) and return its Clip
+
+        on_start(clip) and on_done(clip) are called when it starts and ends.
+        """
+        pygame = self.warm_up()
+        clip = Clip(pygame.mixer.Sound(file=io.BytesIO(data)), on_start, on_done)
+        with self._cond:
+            self._queue.append(clip)
+            self._cond.notify()
+        return clip
+
+    def play(self, data):
+        """Play a clip after anything already queued; block until it ends and return True if it finished"""
+        return self.enqueue(data).wait()
+
+    def pause(self):
+        """Pause the current clip; return False when nothing is playing"""
+        with self._cond:
+            if self._current is None or self._paused:
+                return False
+            self._current.offset = self._position()
+            self._channel.pause()
+            self._paused = True
+            self._cond.notify()
+        return True
+
+    def resume(self):
+        """Resume after pause(); return False when not paused"""
+        with self._cond:
+            if not self._paused:
+                return False
+            self._channel.unpause()
+            self._resumed_at = time.perf_counter()
+            self._paused = False
+            self._cond.notify()
+        return True
+
+    def seek(self, seconds):
+        """Jump to a position in the current clip; return False when nothing is playing"""
+        with self._cond:
+            clip = self._current
+            if clip is None:
+                return False
+            seconds = min(max(0.0, seconds), clip.length)
+            frequency, size, channels = self._pygame.mixer.get_init()
+            frame_bytes = abs(size) // 8 * channels
+            raw = clip.sound.get_raw()
+            start = min(int(seconds * frequency) * frame_bytes, len(raw) - frame_bytes)
+            self._channel.play(self._pygame.mixer.Sound(buffer=raw[max(0, start):]))
+            # play() drops whatever was queued on the channel, so queue it again
+            if self._chained is not None:
+                self._channel.queue(self._chained.sound)
+            if self._paused:
+                self._channel.pause()
+            clip.offset = seconds
+            self._resumed_at = time.perf_counter()
+            self._cond.notify()
+        return True
+
+    def stop(self):
+        """Stop playback and drop every queued clip"""
+        with self._cond:
+            clips = [clip for clip in (self._current, self._chained) if clip is not None]
+            clips.extend(self._queue)
+            self._queue.clear()
+            self._current = self._chained = None
+            self._paused = False
+            if self._channel is not None:
+                self._channel.stop()
+            self._cond.notify()
+        for clip in clips:
+            clip.status = 'stopped'
+            self._finish(clip)
+
+    def _position(self):
+        """Seconds into the current clip; caller holds the lock"""
+        clip = self._current
+        if clip is None:
+            return 0.0
+        if self._paused:
+            return clip.offset
+        return min(clip.length, clip.offset + time.perf_counter() - self._resumed_at)
+
+    def _still_playing(self):
+        """Whether the mixer is still on the current clip; caller holds the lock"""
+        if self._chained is not None:
+            # The queued sound moves out of the queue the moment it starts
+            return self._channel.get_queue() is not None
+        return self._channel.get_busy()
+
+    def _begin(self, clip, at):
+        clip.status = 'playing'
+        clip.offset = 0.0
+        clip.started_at = at
+        self._current = clip
+        self._resumed_at = at
+
+    def _advance(self):
+        """Move playback forward; return (finished, started, seconds to sleep)"""
+        finished, started = [], []
+        current = self._current
+        if current is not None and not self._paused:
+            now = time.perf_counter()
+            end = self._resumed_at + current.length - current.offset
+            if now < end:
+                return finished, started, end - now
+            if now - end < MAX_OVERRUN and self._still_playing():
+                return finished, started, BOUNDARY_SLACK
+            current.status = 'done'
+            finished.append(current)
+            self._current = None
+            if self._chained is not None:
+                # The mixer already started it at the boundary
+                self._begin(self._chained, end)
+                started.append(self._chained)
+                self._chained = None
+
+        if self._current is None and self._queue:
+            clip = self._queue.popleft()
+            self._channel.play(clip.sound)
+            self._begin(clip, time.perf_counter())
+            started.append(clip)
+        if self._current is not None and self._chained is None and self._queue:
+            self._chained = self._queue.popleft()
+            self._channel.queue(self._chained.sound)
+
+        if finished or started:
+            return finished, started, 0
+        return finished, started, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                finished, started, timeout = self._advance()
+                if timeout != 0:
+                    self._cond.wait(None if self._paused else timeout)
+                    continue
+            for clip in finished:
+                self._finish(clip)
+            for clip in started:
+                clip.started.set()
+                self._notify(clip.on_start, clip)
+
+    def _finish(self, clip):
+        if clip.started_at is not None:
+            metrics.observe('tts.play', time.perf_counter() - clip.started_at)
+        clip.started.set()
+        clip.finished.set()
+        self._notify(clip.on_done, clip)
+
+    @staticmethod
+    def _notify(callback, clip):
+        if callback is None:
+            return
+        try:
+            callback(clip)
+        except Exception:
+            traceback.print_exc()
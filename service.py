@@ -0,0 +1,413 @@
+"""
+Headless asyncio HTTP service for Voice Converter Pro
+Serves synthesis and transcription over HTTP from a single process. Requests
+run concurrently on a thread pool (gathered into small batches for backends
+with a native batch call), queues are bounded so overload is answered with
+503 instead of unbounded latency, and audio responses are streamed with
+chunked transfer encoding.
+
+Endpoints:
+  POST /synthesize   JSON {"text": "..."} or text/plain  -> audio stream
+  POST /transcribe   audio/wav, audio/l16;rate=16000      -> {"text": "..."}
+                     (big-endian, RFC 2586) or audio/pcm;rate=16000 (little-endian)
+  GET  /health       queue depths and counters
+  GET  /metrics      per-stage latency histograms (Prometheus text, or ?format=json)
+
+Usage: voice-converter serve [--port 8765] [--tts-backend gtts] [--stt-backend google]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from audio_io import float_to_pcm16, pcm_to_float
+from http_transport import TransportError, configure_transport
+from metrics import metrics
+from recognizers import FailoverRecognizer, create_recognizer
+from synthesizers import create_synthesizer
+
+MAX_BODY_BYTES = 50 * 1024 * 1024
+STREAM_CHUNK_BYTES = 16 * 1024
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 502: 'Bad Gateway',
+    503: 'Service Unavailable',
+}
+
+
+class Overloaded(Exception):
+    """Raised when a batch queue is full"""
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Batcher:
+    """Groups concurrent requests into batches for a blocking backend call
+
+    Items wait in a bounded queue; up to max_batch of them (or whatever
+    arrived within max_delay) are handed to handler(items) on a thread pool,
+    which must return one result or exception per item.
+    """
+
+    def __init__(self, handler, executor, max_batch=8, max_delay=0.01, max_queue=256, runners=4,
+                 stage='batch'):
+        self.handler = handler
+        self.stage = stage
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.runners = runners
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.ensure_future(self._run()) for _ in range(self.runners)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    async def submit(self, item):
+        """Queue one item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            self.queue.put_nowait((item, future, loop.time()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded()
+        return await future
+
+    def _timed_handler(self, items):
+        with metrics.span(f"{self.stage}.batch"):
+            return self.handler(items)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Clients that hung up while queued do not need any work done
+            batch = [(item, future, queued) for item, future, queued in batch if not future.done()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            started = loop.time()
+            for _item, _future, queued in batch:
+                metrics.observe(f"{self.stage}.queue_wait", started - queued)
+            try:
+                results = await loop.run_in_executor(self.executor, self._timed_handler,
+                                                     [item for item, _future, _queued in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_item, future, _queued), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+def decode_audio_body(body, content_type):
+    """Turn a request body into (frame_data, sample_rate, sample_width) mono PCM"""
+    media_type, _, params = content_type.partition(';')
+    media_type = media_type.strip().lower()
+    if media_type in ('audio/l16', 'audio/pcm'):
+        options = dict(param.strip().split('=', 1) for param in params.split(';') if '=' in param)
+        try:
+            rate = int(options.get('rate', 16000))
+        except ValueError:
+            rate = 0
+        if rate <= 0:
+            raise HTTPError(400, f"Invalid sample rate: {options.get('rate')}")
+        if len(body) % 2:
+            raise HTTPError(400, "16-bit PCM body has an odd number of bytes")
+        if media_type == 'audio/l16':
+            # L16 is big-endian (RFC 2586); audio/pcm is taken as little-endian
+            body = np.frombuffer(body, '>i2').astype('<i2').tobytes()
+        return body, rate, 2
+
+    try:
+        with wave.open(io.BytesIO(body), 'rb') as wav:
+            frames = wav.readframes(wav.getnframes())
+            channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+    except (wave.Error, EOFError) as e:
+        raise HTTPError(400, f"Expected a PCM WAV body or audio/l16: {e}")
+    if channels == 1:
+        return frames, rate, width
+    return float_to_pcm16(pcm_to_float(frames, width, channels)), rate, 2
+
+
+class SpeechService:
+    """HTTP front end over one synthesizer and one recognizer backend"""
+
+    def __init__(self, synthesizer, recognizer, workers=8, max_batch=8, max_delay=0.01,
+                 max_queue=256):
+        self.synthesizer = synthesizer
+        self.recognizer = recognizer
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='service')
+        batch = (max_batch, max_delay, max_queue, workers)
+        self.tts_batcher = self._batcher(synthesizer.synthesize_batch, synthesizer.native_batch,
+                                         'service.synthesize', *batch)
+        self.stt_batcher = self._batcher(recognizer.recognize_batch, recognizer.native_batch,
+                                         'service.transcribe', *batch)
+        self.requests = 0
+        self.server = None
+
+    def _batcher(self, handler, native, stage, max_batch, max_delay, max_queue, workers):
+        """Batch for backends with a native batch call; give every other request its own thread
+
+        Without native batching a batch is just its items one after another,
+        so waiting to fill it only costs latency and idles the pool.
+        """
+        if native:
+            return Batcher(handler, self.executor, max_batch, max_delay, max_queue,
+                           max(1, workers // 2), stage)
+        return Batcher(handler, self.executor, 1, 0.0, max_queue, workers, stage)
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.tts_batcher.start()
+        self.stt_batcher.start()
+        self.server = await asyncio.start_server(self.handle_connection, host, port,
+                                                 limit=64 * 1024, backlog=1024)
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.tts_batcher.stop()
+        await self.stt_batcher.stop()
+        self.executor.shutdown(wait=False)
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.send_json(writer, 400, {'error': 'Malformed request line'}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.send_json(writer, 400, {'error': 'Invalid Content-Length'}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.send_json(writer, 413, {'error': 'Request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                self.requests += 1
+                await self.dispatch(method, target, headers, body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, headers, body, writer, keep_alive):
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        routes = {
+            '/synthesize': ('POST', self.synthesize),
+            '/transcribe': ('POST', self.transcribe),
+            '/health': ('GET', self.health),
+            '/metrics': ('GET', self.metrics),
+        }
+        try:
+            if url.path not in routes:
+                raise HTTPError(404, f"No such endpoint: {url.path}")
+            allowed, handler = routes[url.path]
+            if method != allowed:
+                raise HTTPError(405, f"Use {allowed} for {url.path}")
+            await handler(query, headers, body, writer, keep_alive)
+        except HTTPError as e:
+            await self.send_json(writer, e.status, {'error': str(e)}, keep_alive)
+        except Overloaded:
+            await self.send_json(writer, 503, {'error': 'Server busy, try again shortly'},
+                                 keep_alive, {'Retry-After': '1'})
+        except Exception as e:
+            upstream = type(e).__name__ == 'RequestError' or isinstance(e.__cause__, TransportError)
+            status = 502 if upstream else 500
+            await self.send_json(writer, status, {'error': f"{type(e).__name__}: {e}"}, keep_alive)
+
+    async def synthesize(self, query, headers, body, writer, keep_alive):
+        if headers.get('content-type', '').startswith('application/json'):
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                raise HTTPError(400, "Invalid JSON body")
+            if not isinstance(payload, dict) or not isinstance(payload.get('text', ''), str):
+                raise HTTPError(400, 'Expected a JSON object like {"text": "..."}')
+            text = payload.get('text', '')
+        else:
+            try:
+                text = body.decode('utf-8')
+            except UnicodeDecodeError:
+                raise HTTPError(400, "Text body is not valid UTF-8")
+        text = text.strip()
+        if not text:
+            raise HTTPError(400, "No text to synthesize")
+
+        audio = await self.tts_batcher.submit(text)
+        await self.send_stream(writer, 200, self.synthesizer.content_type, audio, keep_alive)
+
+    async def transcribe(self, query, headers, body, writer, keep_alive):
+        if not body:
+            raise HTTPError(400, "No audio in request body")
+        item = decode_audio_body(body, headers.get('content-type', 'audio/wav'))
+        try:
+            text = await self.stt_batcher.submit(item)
+        except Exception as e:
+            if type(e).__name__ != 'UnknownValueError':
+                raise
+            text = ''
+        await self.send_json(writer, 200, {'text': text}, keep_alive)
+
+    async def health(self, query, headers, body, writer, keep_alive):
+        stats = {'status': 'ok', 'requests': self.requests}
+        for name, batcher in (('synthesize', self.tts_batcher), ('transcribe', self.stt_batcher)):
+            stats[name] = {'queued': batcher.depth, 'batches': batcher.batches,
+                           'items': batcher.items, 'rejected': batcher.rejected}
+        await self.send_json(writer, 200, stats, keep_alive)
+
+    async def metrics(self, query, headers, body, writer, keep_alive):
+        if query.get('format') == 'json':
+            await self.send_json(writer, 200, metrics.as_dict(), keep_alive)
+            return
+        data = metrics.prometheus_text().encode('utf-8')
+        head = self._head(200, {'Content-Type': 'text/plain; version=0.0.4',
+                                'Content-Length': str(len(data))}, keep_alive)
+        writer.write(head + data)
+        await writer.drain()
+
+    @staticmethod
+    def _head(status, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        headers = dict(headers, Connection='keep-alive' if keep_alive else 'close')
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def send_json(self, writer, status, payload, keep_alive, extra_headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body))}
+        headers.update(extra_headers or {})
+        writer.write(self._head(status, headers, keep_alive) + body)
+        await writer.drain()
+
+    async def send_stream(self, writer, status, content_type, data, keep_alive):
+        """Send audio with chunked transfer encoding, yielding to slow readers"""
+        headers = {'Content-Type': content_type, 'Transfer-Encoding': 'chunked'}
+        writer.write(self._head(status, headers, keep_alive))
+        view = memoryview(data)
+        for start in range(0, len(view), STREAM_CHUNK_BYTES):
+            chunk = view[start:start + STREAM_CHUNK_BYTES]
+            writer.write(b'%x\r\n' % len(chunk) + bytes(chunk) + b'\r\n')
+            await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+
+async def serve(service, host, port):
+    await service.start(host, port)
+    print(f"🌐 Voice Converter service listening on http://{host}:{service.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    """Command line entry point for `voice-converter serve`"""
+    parser = argparse.ArgumentParser(prog='voice-converter serve',
+                                     description='Run the headless TTS/STT HTTP service.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on (default: 8765)')
+    parser.add_argument('--tts-backend', default='gtts', help='synthesizer backend (default: gtts)')
+    parser.add_argument('--stt-backend', default='google', help='recognizer backend (default: google)')
+    parser.add_argument('--language', default='en-US', help='recognition language')
+    parser.add_argument('--stt-fallback', metavar='BACKEND',
+                        help='local recognizer used while a remote --stt-backend is unreachable, e.g. sphinx')
+    parser.add_argument('--http-timeout', type=float, default=15.0,
+                        help='seconds to wait for a remote engine to answer (default: 15)')
+    parser.add_argument('--http-retries', type=int, default=2,
+                        help='retries of a failed remote engine request (default: 2)')
+    parser.add_argument('-w', '--workers', type=int, default=8,
+                        help='threads running backend calls (default: 8)')
+    parser.add_argument('--max-batch', type=int, default=8,
+                        help='largest batch per call for backends that batch natively')
+    parser.add_argument('--max-delay', type=float, default=0.01,
+                        help='seconds to wait for a batch to fill (default: 0.01)')
+    parser.add_argument('--max-queue', type=int, default=256,
+                        help='queued requests per endpoint before answering 503 (default: 256)')
+    args = parser.parse_args(argv)
+
+    configure_transport(read_timeout=args.http_timeout, retries=args.http_retries)
+    recognizer = create_recognizer(args.stt_backend, language=args.language)
+    if args.stt_fallback and recognizer.remote:
+        recognizer = FailoverRecognizer(recognizer, create_recognizer(args.stt_fallback, language=args.language))
+    service = SpeechService(create_synthesizer(args.tts_backend), recognizer,
+                            workers=args.workers, max_batch=args.max_batch,
+                            max_delay=args.max_delay, max_queue=args.max_queue)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,6 +13,34 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/harshit001-2023/voice-converter-pro",
     packages=find_packages(),
+    py_modules=[
+        "voice_converter",
+        "tts_stt_app",
+        "ui_dispatch",
+        "voice_engine",
+        "audio_io",
+        "recognizers",
+        "http_transport",
+        "batch_transcribe",
+        "batch_synthesize",
+        "streaming_transcribe",
+        "partial_transcribe",
+        "disk_cache",
+        "tts_cache",
+        "stt_cache",
+        "speech_pipeline",
+        "playback",
+        "tts_worker",
+        "history_store",
+        "transcript",
+        "noise_floor",
+        "continuous_listen",
+        "startup_profile",
+        "metrics",
+        "synthesizers",
+        "service",
+        "benchmarks",
+    ],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: End Users/Desktop",
@@ -34,8 +62,13 @@ setup(
         "gTTS>=2.3.2",
         "pygame>=2.5.2",
         "pyaudio>=0.2.11",
+        "numpy>=1.21",
     ],
     extras_require={
+        "offline": [
+            "pocketsphinx>=0.1.15,<5",
+            "vosk>=0.3.45",
+        ],
         "dev": [
             "pytest>=6.0",
             "black>=21.0",
@@ -0,0 +1,121 @@
+"""
+Sentence-pipelined speech output
+Text is split into sentences and sentence N+1 is synthesized while sentence N
+plays, so the first audio arrives after one sentence of work no matter how
+long the document is. Cancellation takes effect between segments and also
+cuts off the clip that is currently playing.
+"""
+
+import os
+import re
+import tempfile
+import threading
+
+from metrics import metrics
+
+# Longest segment sent to the engine in one go; long run-on sentences are
+# split further so time-to-first-audio stays bounded
+MAX_SEGMENT_CHARS = 200
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+|\n+')
+_SOFT_BREAK = re.compile(r'(?<=[,;:])\s+')
+
+
+def split_sentences(text, max_chars=MAX_SEGMENT_CHARS):
+    """Split text into speakable segments of at most max_chars characters"""
+    segments = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+            continue
+
+        # Break long sentences at clause boundaries, then at word boundaries
+        current = ''
+        for part in _SOFT_BREAK.split(sentence):
+            for word in part.split():
+                if current and len(current) + len(word) + 1 > max_chars:
+                    segments.append(current)
+                    current = word
+                else:
+                    current = f"{current} {word}" if current else word
+            if current and len(current) > max_chars // 2:
+                segments.append(current)
+                current = ''
+        if current:
+            segments.append(current)
+    return segments
+
+
+def pyttsx3_synthesizer(engine):
+    """Return a function that renders text to audio bytes with a pyttsx3 engine"""
+    def synthesize(text):
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+    return synthesize
+
+
+class SpeechPipeline:
+    """Speaks one text sentence by sentence with synthesis running one step ahead
+
+    Segments are synthesized on the thread calling speak(), so an engine
+    owned by that thread is never touched from anywhere else; only playback
+    runs in the background, on the player. A pipeline is single use:
+    cancel() may be called before speak() starts and the run is then
+    skipped, so create a new pipeline per utterance.
+    """
+
+    def __init__(self, synthesize, player):
+        self.synthesize = synthesize
+        self.player = player
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop after the current segment and cut off playback"""
+        self._cancelled.set()
+        self.player.stop()
+
+    def speak(self, text, on_segment=None):
+        """Speak text and return True if it finished without being cancelled
+
+        Each segment is queued on the player as soon as it is synthesized and
+        the next one is rendered while it plays, so they play back to back
+        with no gap; on_segment(segment) is called as each one starts playing.
+        """
+        finished = False
+        previous = None
+        try:
+            for segment in split_sentences(text):
+                if self._cancelled.is_set():
+                    break
+                with metrics.span('tts.segment_synthesize'):
+                    clip = self.synthesize(segment)
+                if self._cancelled.is_set():
+                    break
+                on_start = (lambda _clip, segment=segment: on_segment(segment)) if on_segment else None
+                queued = self.player.enqueue(clip, on_start=on_start)
+                # Stay at most one queued clip ahead of what is audible
+                if previous is not None:
+                    previous.started.wait()
+                previous = queued
+            else:
+                finished = previous.wait() if previous is not None else True
+        finally:
+            # Drop clips queued after a cancel or a failed segment
+            if not finished:
+                self.player.stop()
+            self._cancelled.set()
+        return finished
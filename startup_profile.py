@@ -0,0 +1,124 @@
+"""
+Startup-time profiling for Voice Converter Pro
+Enabled with `voice-converter --startup-profile`, it records how long each
+top-level import and each subsystem initialization takes, and prints a
+report once startup has finished so cold-start regressions are easy to spot.
+"""
+
+import builtins
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Reference point for "time since launch"
+_PROCESS_START = time.perf_counter()
+
+
+class StartupProfiler:
+    """Collects import and initialization timings"""
+
+    def __init__(self):
+        self.enabled = False
+        self.output_file = None
+        self.imports = []   # [module, seconds, depth] in the order the imports started
+        self.spans = []     # (name, seconds, thread name)
+        self.marks = []     # (name, seconds since launch)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._original_import = None
+
+    def enable(self, output_file=None):
+        """Start recording and hook module imports"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.output_file = output_file
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def disable(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+        self.enabled = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        """__import__ replacement that times the first import of each module
+
+        Only imports made directly by our code and their immediate
+        dependencies are recorded, which keeps the report readable.
+        """
+        top = name.partition('.')[0]
+        depth = getattr(self._local, 'depth', 0)
+        if level or top in sys.modules or depth > 1:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        record = [top, 0.0, depth]
+        with self._lock:
+            self.imports.append(record)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            record[1] = time.perf_counter() - start
+
+    @contextmanager
+    def span(self, name):
+        """Time a block of initialization work"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.spans.append((name, time.perf_counter() - start,
+                                   threading.current_thread().name))
+
+    def mark(self, name):
+        """Record a milestone such as the window first being shown"""
+        if self.enabled:
+            with self._lock:
+                self.marks.append((name, time.perf_counter() - _PROCESS_START))
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'imports': [{'module': name, 'ms': round(seconds * 1000, 2), 'depth': depth}
+                            for name, seconds, depth in self.imports],
+                'init': [{'name': name, 'ms': round(seconds * 1000, 2), 'thread': thread}
+                         for name, seconds, thread in self.spans],
+                'marks': [{'name': name, 'ms': round(seconds * 1000, 2)}
+                          for name, seconds in self.marks],
+            }
+
+    def report(self, stream=None):
+        """Print the collected timings and write them to the JSON file if one was given"""
+        if not self.enabled:
+            return
+        stream = stream or sys.stderr
+        data = self.as_dict()
+
+        print("\n⏱️ Startup profile", file=stream)
+        print("Imports:", file=stream)
+        for item in data['imports']:
+            print(f"  {item['ms']:9.2f} ms  {'  ' * item['depth']}{item['module']}", file=stream)
+        print("Initialization:", file=stream)
+        for item in data['init']:
+            where = '' if item['thread'] == 'MainThread' else f"  (background: {item['thread']})"
+            print(f"  {item['ms']:9.2f} ms  {item['name']}{where}", file=stream)
+        print("Milestones (since launch):", file=stream)
+        for item in data['marks']:
+            print(f"  {item['ms']:9.2f} ms  {item['name']}", file=stream)
+
+        if self.output_file:
+            with open(self.output_file, 'w') as f:
+                json.dump(data, f, indent=2)
+
+
+profiler = StartupProfiler()
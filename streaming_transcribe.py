@@ -0,0 +1,303 @@
+"""
+Streaming transcription of long recordings
+WAV files are memory-mapped and walked in bounded windows, each cut at the
+quietest frame near its end so words are not split. Windows are recognized
+concurrently but yielded in order, and only a few are held in memory at once,
+so peak memory stays flat regardless of the recording length. Other formats
+(MP3, M4A, FLAC, AIFF) are decoded chunk by chunk to 16 kHz mono and cut into
+the same windows from a rolling buffer as they arrive, so recognition starts
+before the decode finishes; windows above 16 kHz are downsampled before they
+are sent.
+
+Usage: voice-converter stream <audio file> [-o segments.jsonl] [-w workers]
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import speech_recognition as sr
+
+from audio_io import TARGET_RATE, decode_chunks, float_to_pcm16, frame_rms, pcm_to_float, resample
+from metrics import metrics
+from recognizers import create_recognizer
+from stt_cache import DEFAULT_CACHE_DIR, CachedRecognizer, TranscriptCache
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavMap:
+    """Memory-mapped, read-only access to the PCM frames of a WAV file"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._parse_header()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+    def _parse_header(self):
+        """Locate the fmt and data chunks without reading the audio"""
+        f = self._file
+        riff, _size, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("Not a RIFF/WAVE file")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError("WAV file has no data chunk")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(chunk_size - 16 + chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+        if fmt is None:
+            raise ValueError("WAV file has no fmt chunk")
+        format_tag, self.channels, self.sample_rate, _byte_rate, self.block_align, bits = fmt
+        if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE):
+            raise ValueError(f"Unsupported WAV encoding: {format_tag:#x}")
+
+        self.sample_width = bits // 8
+        self.data_offset = f.tell()
+        # Recorders that were killed mid-write leave a bogus data size
+        file_size = os.fstat(f.fileno()).st_size
+        data_size = min(chunk_size, file_size - self.data_offset)
+        self.frame_count = data_size // self.block_align
+
+    @property
+    def duration(self):
+        return self.frame_count / float(self.sample_rate)
+
+    def frames(self, start, stop):
+        """Return the raw bytes of frames [start, stop)"""
+        begin = self.data_offset + start * self.block_align
+        return self._map[begin:self.data_offset + stop * self.block_align]
+
+    def samples(self, start, stop):
+        """Return frames [start, stop) as a mono float array"""
+        return pcm_to_float(self.frames(start, stop), self.sample_width, self.channels)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_wav(path):
+    """Memory-map a PCM WAV file, or return None for audio that has to be decoded"""
+    if path.lower().endswith('.wav'):
+        try:
+            return WavMap(path)
+        except ValueError:
+            pass   # float or compressed WAV
+    return None
+
+
+def _quietest_cut(samples, region_start, hop):
+    """Index just past the middle of the quietest hop-sized frame of samples[region_start:]"""
+    energy = frame_rms(samples[region_start:], hop)
+    if not len(energy):
+        return len(samples)
+    return region_start + int(np.argmin(energy)) * hop + hop // 2
+
+
+def iter_chunks(wav, window=30.0, search=5.0, frame_ms=30):
+    """Yield (start, stop) frame ranges cut at the quietest frame near each window end"""
+    window_frames = int(window * wav.sample_rate)
+    search_frames = int(min(search, window / 2) * wav.sample_rate)
+    hop = max(1, int(wav.sample_rate * frame_ms / 1000))
+
+    start = 0
+    while start < wav.frame_count:
+        end = start + window_frames
+        if end >= wav.frame_count:
+            yield start, wav.frame_count
+            return
+
+        region_start = end - search_frames
+        cut = region_start + _quietest_cut(wav.samples(region_start, end), 0, hop)
+        yield start, cut
+        start = cut
+
+
+def iter_decoded_chunks(chunks, sample_rate, window=30.0, search=5.0, frame_ms=30):
+    """Cut a stream of mono float chunks like iter_chunks, yielding (start, stop, samples)
+
+    Only about one window plus one decoded chunk is buffered at a time.
+    """
+    window_frames = int(window * sample_rate)
+    search_frames = int(min(search, window / 2) * sample_rate)
+    hop = max(1, int(sample_rate * frame_ms / 1000))
+
+    start = 0
+    buffer = np.zeros(0, dtype=np.float32)
+    for chunk in chunks:
+        buffer = np.concatenate((buffer, chunk))
+        # Like iter_chunks, a window is only cut once audio continues past its end
+        while len(buffer) > window_frames:
+            cut = _quietest_cut(buffer[:window_frames], window_frames - search_frames, hop)
+            yield start, start + cut, buffer[:cut].copy()
+            buffer = buffer[cut:]
+            start += cut
+    if len(buffer):
+        yield start, start + len(buffer), buffer
+
+
+def _recognize_chunk(recognizer, wav, start, stop, silence_threshold, sample_rate=TARGET_RATE):
+    """Recognize frames [start, stop) of a WavMap and return its segment record"""
+    rate = wav.sample_rate
+    if wav.channels == 1 and wav.sample_width == 2 and rate <= sample_rate:
+        pcm = wav.frames(start, stop)
+        samples = pcm_to_float(pcm, 2)
+    else:
+        samples = wav.samples(start, stop)
+        if rate > sample_rate:
+            samples = resample(samples, rate, sample_rate)
+            rate = sample_rate
+        pcm = float_to_pcm16(samples)
+    return _recognize_samples(recognizer, start / float(wav.sample_rate), stop / float(wav.sample_rate),
+                              samples, pcm, rate, silence_threshold)
+
+
+def _recognize_decoded(recognizer, start, stop, samples, sample_rate, silence_threshold):
+    """Recognize one window of decoded float samples and return its segment record"""
+    return _recognize_samples(recognizer, start / float(sample_rate), stop / float(sample_rate),
+                              samples, float_to_pcm16(samples), sample_rate, silence_threshold)
+
+
+def _recognize_samples(recognizer, start, end, samples, pcm, rate, silence_threshold):
+    """Recognize one window unless it is silent; start and end are in seconds"""
+    segment = {'start': round(start, 3), 'end': round(end, 3), 'text': ''}
+
+    # Skip the network round trip for chunks that are pure silence
+    hop = max(1, rate // 50)
+    energy = frame_rms(samples, hop)
+    if not len(energy) or energy.max() < silence_threshold:
+        return segment
+
+    try:
+        with metrics.span('stt.recognize'):
+            segment['text'] = recognizer.recognize(pcm, rate, 2)
+    except sr.UnknownValueError:
+        pass
+    return segment
+
+
+def stream_transcribe(path, recognizer, window=30.0, search=5.0, workers=4,
+                      silence_threshold=0.005, sample_rate=TARGET_RATE):
+    """Yield transcript segments of an audio file, in order, as they are recognized
+
+    Audio is sent to the recognizer as 16-bit mono at no more than sample_rate.
+    """
+    wav = open_wav(path)
+    if wav is not None:
+        with wav:
+            yield from _in_order(workers, ((_recognize_chunk, recognizer, wav, start, stop,
+                                            silence_threshold, sample_rate)
+                                           for start, stop in iter_chunks(wav, window, search)))
+        return
+
+    windows = iter_decoded_chunks(decode_chunks(path, sample_rate), sample_rate, window, search)
+    yield from _in_order(workers, ((_recognize_decoded, recognizer, start, stop, samples,
+                                    sample_rate, silence_threshold)
+                                   for start, stop, samples in windows))
+
+
+def _in_order(workers, calls):
+    """Run (func, *args) calls on a thread pool and yield their results in order
+
+    Calls are only taken from the iterable as results are consumed, so the
+    windows in flight (and the audio read or decoded for them) stay bounded.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        try:
+            for call in calls:
+                pending.append(pool.submit(*call))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def stitch_transcript(segments):
+    """Join the text of recognized segments into one transcript"""
+    return ' '.join(segment['text'] for segment in segments if segment['text'])
+
+
+def format_timestamp(seconds):
+    """Format seconds as HH:MM:SS.s"""
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:04.1f}"
+
+
+def main(argv=None):
+    """Command line entry point for `voice-converter stream`"""
+    parser = argparse.ArgumentParser(prog='voice-converter stream',
+                                     description='Transcribe a long recording in bounded memory.')
+    parser.add_argument('file', help='audio file to transcribe (WAV, MP3, M4A, FLAC or AIFF)')
+    parser.add_argument('-o', '--output', help='also write segments to this JSONL file')
+    parser.add_argument('-b', '--backend', default='google', help='recognizer backend (default: google)')
+    parser.add_argument('--language', default='en-US', help='recognition language')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='chunks recognized concurrently (default: 4)')
+    parser.add_argument('--window', type=float, default=30.0,
+                        help='maximum chunk length in seconds (default: 30)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'transcript cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore cached transcripts and re-recognize everything, refreshing the cache')
+    args = parser.parse_args(argv)
+
+    recognizer = CachedRecognizer(create_recognizer(args.backend, language=args.language),
+                                  TranscriptCache(args.cache_dir), bypass=args.no_cache)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else None
+    segments = []
+    try:
+        for segment in stream_transcribe(args.file, recognizer, window=args.window,
+                                         workers=args.workers):
+            # Keep only the text so the stitched transcript is all we accumulate
+            segments.append({'text': segment['text']})
+            if out:
+                out.write(json.dumps(segment) + '\n')
+            if segment['text']:
+                print(f"[{format_timestamp(segment['start'])} - "
+                      f"{format_timestamp(segment['end'])}] {segment['text']}")
+    except (ValueError, sr.RequestError) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        if out:
+            out.close()
+
+    print("\nTranscript:")
+    print(stitch_transcript(segments))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Cache of recognized transcripts keyed by an audio fingerprint
+The same audio sent to the same backend with the same settings (a re-uploaded
+file, a batch re-run after a crash) is answered from disk instead of another
+recognizer round trip, so it costs no recognizer quota.
+"""
+
+import hashlib
+import json
+import os
+
+from audio_io import float_to_pcm16, pcm_to_float
+from disk_cache import DiskCache, make_key
+from recognizers import RecognizerBackend
+
+DEFAULT_CACHE_DIR = os.path.join('voice_cache', 'stt')
+
+
+class TranscriptCache(DiskCache):
+    """Disk cache of transcripts"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=50 * 1024 * 1024):
+        super().__init__(directory, max_bytes)
+
+    @staticmethod
+    def fingerprint(frame_data, sample_rate, sample_width):
+        """Hash PCM audio after normalizing it to 16-bit samples"""
+        if sample_width != 2:
+            frame_data = float_to_pcm16(pcm_to_float(frame_data, sample_width))
+        digest = hashlib.sha256(f"{sample_rate}:".encode('ascii'))
+        digest.update(frame_data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(fingerprint, backend, settings):
+        """Return the cache key for one recognition request"""
+        return make_key(audio=fingerprint, backend=backend, settings=settings)
+
+
+class CachedRecognizer(RecognizerBackend):
+    """Recognizer backend wrapper that serves repeated audio from a TranscriptCache
+
+    "No speech recognized" results are cached too and raised again as
+    UnknownValueError. With bypass=True every request goes to the backend and
+    its result replaces the cached one.
+    """
+
+    def __init__(self, backend, cache=None, bypass=False):
+        self.backend = backend
+        self.cache = cache if cache is not None else TranscriptCache()
+        self.bypass = bypass
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    @property
+    def remote(self):
+        return self.backend.remote
+
+    @property
+    def native_batch(self):
+        return self.backend.native_batch
+
+    @property
+    def incremental(self):
+        return self.backend.incremental
+
+    def settings(self):
+        return self.backend.settings()
+
+    def open_stream(self, sample_rate, sample_width):
+        return self.backend.open_stream(sample_rate, sample_width)
+
+    def preload(self):
+        self.backend.preload()
+
+    def _key(self, frame_data, sample_rate, sample_width):
+        fingerprint = self.cache.fingerprint(frame_data, sample_rate, sample_width)
+        return self.cache.key(fingerprint, self.backend.name, self.backend.settings())
+
+    def _lookup(self, key):
+        """Return the cached transcript (None for no speech), or raise KeyError on a miss"""
+        data = None if self.bypass else self.cache.get(key)
+        if data is None:
+            raise KeyError(key)
+        return json.loads(data.decode('utf-8'))['text']
+
+    def _store(self, key, text):
+        self.cache.put(key, json.dumps({'text': text}).encode('utf-8'), '.json')
+
+    @staticmethod
+    def _result(text):
+        if text is None:
+            import speech_recognition as sr
+            raise sr.UnknownValueError()
+        return text
+
+    def recognize(self, frame_data, sample_rate, sample_width):
+        import speech_recognition as sr
+        key = self._key(frame_data, sample_rate, sample_width)
+        try:
+            return self._result(self._lookup(key))
+        except KeyError:
+            pass
+        try:
+            text = self.backend.recognize(frame_data, sample_rate, sample_width)
+        except sr.UnknownValueError:
+            self._store(key, None)
+            raise
+        self._store(key, text)
+        return text
+
+    def recognize_batch(self, items):
+        """Answer cached items directly and send only the misses to the backend in one batch"""
+        import speech_recognition as sr
+        keys = [self._key(*item) for item in items]
+        results = [None] * len(items)
+        misses = []
+        for i, key in enumerate(keys):
+            try:
+                text = self._lookup(key)
+            except KeyError:
+                misses.append(i)
+                continue
+            results[i] = text if text is not None else sr.UnknownValueError()
+
+        if misses:
+            for i, result in zip(misses, self.backend.recognize_batch([items[i] for i in misses])):
+                if isinstance(result, sr.UnknownValueError):
+                    self._store(keys[i], None)
+                elif not isinstance(result, Exception):
+                    self._store(keys[i], result)
+                results[i] = result
+        return results
@@ -0,0 +1,171 @@
+"""
+Pluggable speech synthesis backends for Voice Converter Pro
+Every backend turns text into a complete audio file in memory, mirroring
+the recognizer backends in recognizers.py.
+"""
+
+import base64
+import importlib
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+import wave
+
+from http_transport import TransportError, shared_transport
+
+GTTS_ENDPOINT = 'https://translate.google.com/_/TranslateWebserverUi/data/batchexecute'
+
+
+def gtts_request(text, lang='en', slow=False, endpoint=GTTS_ENDPOINT, transport=None):
+    """Fetch MP3 bytes for text from Google TTS over the shared keep-alive transport
+
+    gTTS splits the text and builds the request bodies; they are sent here
+    instead of through a new requests session per part. Raises gTTSError.
+    """
+    from gtts import gTTS
+    from gtts.tts import gTTSError
+    transport = transport or shared_transport()
+    audio = io.BytesIO()
+    for body in gTTS(text=text, lang=lang, slow=slow).get_bodies():
+        try:
+            response = transport.request('POST', endpoint, body=body.encode('utf-8'),
+                                         headers=gTTS.GOOGLE_TTS_HEADERS)
+        except TransportError as e:
+            raise gTTSError(f"Google TTS request failed: {e}") from e
+        for line in response.text().splitlines():
+            if gTTS.GOOGLE_TTS_RPC in line:
+                match = re.search(r'jQ1olc","\[\\"(.*)\\"]', line)
+                if not match:
+                    raise gTTSError("Google TTS returned no audio")
+                audio.write(base64.b64decode(match.group(1)))
+    return audio.getvalue()
+
+
+class SynthesizerBackend:
+    """Base class for speech synthesis backends"""
+
+    name = 'base'
+    content_type = 'application/octet-stream'
+    suffix = ''
+    native_batch = False  # True when synthesize_batch() is cheaper than one call per text
+
+    def synthesize(self, text):
+        """Return the audio bytes for text"""
+        raise NotImplementedError
+
+    def synthesize_batch(self, texts):
+        """Synthesize several texts, returning bytes or the exception for each
+
+        Identical texts in one batch are only synthesized once.
+        """
+        results = {}
+        for text in texts:
+            if text not in results:
+                try:
+                    results[text] = self.synthesize(text)
+                except Exception as e:
+                    results[text] = e
+        return [results[text] for text in texts]
+
+
+class GTTSSynthesizer(SynthesizerBackend):
+    """Google Text-to-Speech (MP3), served from the speech cache when possible"""
+
+    name = 'gtts'
+    content_type = 'audio/mpeg'
+    suffix = '.mp3'
+
+    def __init__(self, language='en', slow=False, cache=None, endpoint=GTTS_ENDPOINT):
+        if cache is None:
+            from tts_cache import SpeechCache
+            cache = SpeechCache()
+        self.language = language
+        self.slow = slow
+        self.cache = cache
+        self.endpoint = endpoint
+
+    def synthesize(self, text):
+        return self.cache.gtts(text, lang=self.language, slow=self.slow, endpoint=self.endpoint)
+
+
+class Pyttsx3Synthesizer(SynthesizerBackend):
+    """Local system voices through pyttsx3 (WAV)
+
+    A pyttsx3 engine can only be used by one thread at a time, so calls are
+    serialized; use one instance per process to scale out.
+    """
+
+    name = 'pyttsx3'
+    content_type = 'audio/wav'
+    suffix = '.wav'
+
+    def __init__(self, rate=None, volume=None, voice=None, language=None):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        self._lock = threading.Lock()
+        for name, value in (('rate', rate), ('volume', volume), ('voice', voice)):
+            if value is not None:
+                self.engine.setProperty(name, value)
+
+    def synthesize(self, text):
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            with self._lock:
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+
+
+class StubSynthesizer(SynthesizerBackend):
+    """Local offline backend producing silent WAV audio, used for testing"""
+
+    name = 'stub'
+    content_type = 'audio/wav'
+    suffix = '.wav'
+
+    def __init__(self, delay=0.0, seconds_per_char=0.05, sample_rate=16000, language=None):
+        self.delay = float(delay)
+        self.seconds_per_char = seconds_per_char
+        self.sample_rate = sample_rate
+
+    def synthesize(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        frames = int(len(text) * self.seconds_per_char * self.sample_rate)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(b'\0\0' * frames)
+        return buffer.getvalue()
+
+
+BACKENDS = {
+    'gtts': GTTSSynthesizer,
+    'pyttsx3': Pyttsx3Synthesizer,
+    'stub': StubSynthesizer,
+}
+
+
+def register_backend(name, backend_class):
+    """Make a backend class available under the given name"""
+    BACKENDS[name] = backend_class
+
+
+def create_synthesizer(name='gtts', **options):
+    """Instantiate a backend by name or by 'module:ClassName' path"""
+    if name in BACKENDS:
+        return BACKENDS[name](**options)
+    if ':' in name:
+        module_name, class_name = name.split(':', 1)
+        backend_class = getattr(importlib.import_module(module_name), class_name)
+        return backend_class(**options)
+    raise ValueError(f"Unknown synthesizer backend: {name}")
@@ -0,0 +1,74 @@
+"""End-to-end tests of the headless service over the stub backends"""
+
+import asyncio
+import json
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognizers import StubRecognizer  # noqa: E402
+from service import SpeechService, decode_audio_body  # noqa: E402
+from synthesizers import StubSynthesizer  # noqa: E402
+
+
+async def _request(port, path, body=b'', content_type='application/json', method='POST'):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Type: {content_type}\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    if b'Transfer-Encoding: chunked' in head:
+        chunks = []
+        while True:
+            size, _, payload = payload.partition(b'\r\n')
+            if not int(size, 16):
+                break
+            chunks.append(payload[:int(size, 16)])
+            payload = payload[int(size, 16) + 2:]
+        payload = b''.join(chunks)
+    return int(head.split()[1]), payload
+
+
+def _run(*requests):
+    """Start a stub service, send each (path, body, content_type) and return (status, body) pairs"""
+    async def main():
+        service = SpeechService(StubSynthesizer(), StubRecognizer())
+        await service.start('127.0.0.1', 0)
+        try:
+            return [await _request(service.port, *request) for request in requests]
+        finally:
+            await service.stop()
+    return asyncio.run(main())
+
+
+def test_synthesize_and_transcribe():
+    (status, audio), (status_l16, body) = _run(
+        ('/synthesize', json.dumps({'text': 'Hello there'}).encode()),
+        ('/transcribe', bytes(32000), 'audio/l16;rate=16000'))
+    assert status == 200 and audio.startswith(b'RIFF')
+    assert status_l16 == 200
+    assert json.loads(body) == {'text': 'stub transcript 1.00s'}
+
+
+def test_bad_input_is_a_client_error():
+    results = _run(
+        ('/transcribe', bytes(100), 'audio/l16;rate=abc'),
+        ('/transcribe', bytes(101), 'audio/l16;rate=16000'),
+        ('/transcribe', b'not a wav file', 'audio/wav'),
+        ('/synthesize', b'\xff\xfe\xfa', 'text/plain'),
+        ('/synthesize', b'[1]'),
+        ('/synthesize', b'{"text": '),
+        ('/synthesize', b'{"text": "  "}'),
+        ('/nowhere', b''))
+    assert [status for status, _body in results] == [400, 400, 400, 400, 400, 400, 400, 404]
+
+
+def test_l16_is_big_endian():
+    frames, rate, width = decode_audio_body(struct.pack('>2h', 1, -2), 'audio/L16; rate=8000')
+    assert (struct.unpack('<2h', frames), rate, width) == ((1, -2), 8000, 2)
+    frames, _rate, _width = decode_audio_body(struct.pack('<2h', 1, -2), 'audio/pcm')
+    assert struct.unpack('<2h', frames) == (1, -2)
@@ -0,0 +1,126 @@
+"""
+Structured transcript model for Voice Converter Pro
+Recognized speech is kept as a list of segments (timestamp, source, text,
+confidence, offset into the audio) instead of as widget text, so appending
+is O(1), views render only the rows they show, and copy/export read the
+data directly.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+
+
+class Segment:
+    """One recognized piece of speech"""
+
+    __slots__ = ('timestamp', 'source', 'text', 'confidence', 'offset')
+
+    def __init__(self, text, source, timestamp=None, confidence=None, offset=None):
+        self.text = text
+        self.source = source            # e.g. "Microphone", "Hands-free", "File: talk.wav"
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.confidence = confidence    # 0.0-1.0 if the caller has one; backends return text only
+        self.offset = offset            # seconds into the source audio, for files
+
+    def as_dict(self):
+        return {
+            'timestamp': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'source': self.source,
+            'text': self.text,
+            'confidence': self.confidence,
+            'offset': self.offset,
+        }
+
+    def format(self):
+        """Format the segment as one line of display text"""
+        if self.offset is not None:
+            from streaming_transcribe import format_timestamp
+            label = f"{self.source} @ {format_timestamp(self.offset)}"
+        else:
+            label = datetime.fromtimestamp(self.timestamp).strftime('%H:%M:%S')
+        if self.confidence is not None:
+            return f"[{label}] {self.text} ({self.confidence:.0%})"
+        return f"[{label}] {self.text}"
+
+
+class TranscriptModel:
+    """Thread-safe, append-only list of transcript segments
+
+    A provisional partial segment can follow the last one while speech is
+    still being recognized; it is not part of the text or exports and is
+    replaced by the next append(). Listeners are called with no arguments
+    after every change, on the thread that made it.
+    """
+
+    def __init__(self):
+        self._segments = []
+        self._partial = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def __len__(self):
+        with self._lock:
+            return len(self._segments)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _changed(self):
+        for listener in self._listeners:
+            listener()
+
+    @property
+    def partial(self):
+        """The provisional segment, or None"""
+        with self._lock:
+            return self._partial
+
+    def set_partial(self, text, source):
+        """Show text as the provisional segment until the final one is appended"""
+        with self._lock:
+            self._partial = Segment(text, source)
+        self._changed()
+
+    def clear_partial(self):
+        with self._lock:
+            if self._partial is None:
+                return
+            self._partial = None
+        self._changed()
+
+    def append(self, text, source, timestamp=None, confidence=None, offset=None):
+        """Add a segment at the end, replacing any partial one, and return it"""
+        segment = Segment(text, source, timestamp, confidence, offset)
+        with self._lock:
+            self._segments.append(segment)
+            self._partial = None
+        self._changed()
+        return segment
+
+    def clear(self):
+        with self._lock:
+            self._segments = []
+            self._partial = None
+        self._changed()
+
+    def slice(self, start, stop):
+        """Return segments [start, stop) as a list"""
+        with self._lock:
+            return self._segments[start:stop]
+
+    def text(self):
+        """The recognized text of every segment, joined with spaces"""
+        with self._lock:
+            return ' '.join(segment.text for segment in self._segments)
+
+    def export(self, filename):
+        """Write the transcript as JSON (.json) or as display lines (anything else)"""
+        with self._lock:
+            segments = list(self._segments)
+        with open(filename, 'w', encoding='utf-8') as f:
+            if filename.lower().endswith('.json'):
+                json.dump([segment.as_dict() for segment in segments], f, indent=2, ensure_ascii=False)
+            else:
+                f.write('\n\n'.join(segment.format() for segment in segments) + '\n')
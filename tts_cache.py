@@ -0,0 +1,33 @@
+"""
+Cache of synthesized speech keyed by text and voice settings
+Repeated phrases are served from disk instead of another synthesis round trip.
+"""
+
+import os
+
+from disk_cache import DiskCache, make_key
+
+DEFAULT_CACHE_DIR = os.path.join('voice_cache', 'tts')
+
+
+class SpeechCache(DiskCache):
+    """Disk cache of synthesized audio"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=200 * 1024 * 1024):
+        super().__init__(directory, max_bytes)
+
+    @staticmethod
+    def key(text, language, engine, rate=None, voice=None, volume=None):
+        """Return the cache key for one synthesis request"""
+        return make_key(text=text, language=language, engine=engine,
+                        rate=rate, voice=voice, volume=volume)
+
+    def gtts(self, text, lang='en', slow=False, endpoint=None):
+        """Return MP3 bytes for text from the cache or from Google TTS"""
+        key = self.key(text, lang, 'gtts', rate='slow' if slow else 'normal')
+        data = self.get(key)
+        if data is None:
+            from synthesizers import GTTS_ENDPOINT, gtts_request
+            data = gtts_request(text, lang=lang, slow=slow, endpoint=endpoint or GTTS_ENDPOINT)
+            self.put(key, data, suffix='.mp3')
+        return data
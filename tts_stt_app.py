@@ -1,17 +1,180 @@
 import tkinter as tk
-from tkinter import ttk, scrolledtext, filedialog, messagebox
-import pyttsx3
-import speech_recognition as sr
+from tkinter import ttk, scrolledtext, filedialog, messagebox, font as tkfont
 import threading
-import json
 import os
 from datetime import datetime
-import pygame
-import io
-from gtts import gTTS
-import tempfile
-import wave
-import pyaudio
+from history_store import parse_date
+from metrics import metrics
+from recognizers import BACKENDS as RECOGNIZER_BACKENDS
+from startup_profile import profiler
+from transcript import TranscriptModel
+from ui_dispatch import UIDispatcher
+from voice_engine import VoiceEngine
+
+# The window is a thin client of VoiceEngine, which loads the audio stack
+# lazily, so the window appears before pyttsx3, speech_recognition and
+# pygame are imported and the app still starts without an audio device.
+
+HISTORY_PAGE_SIZE = 200
+STATS_REFRESH_MS = 1000
+
+# Notification colours and how long each kind stays on screen
+NOTIFICATION_STYLES = {
+    'info': ('#27ae60', 4000),
+    'warning': ('#f39c12', 6000),
+    'error': ('#c0392b', 10000),
+}
+MAX_NOTIFICATIONS = 4
+
+
+class NotificationArea(tk.Frame):
+    """Stack of non-modal messages in the corner of the window
+    
+    Each message disappears after a while or when clicked; only the newest
+    MAX_NOTIFICATIONS are kept. Must be used on the Tk thread.
+    """
+    
+    def __init__(self, master, **options):
+        super().__init__(master, **options)
+        self.messages = []
+    
+    def show(self, message, level='info'):
+        color, duration = NOTIFICATION_STYLES[level]
+        label = tk.Label(self, text=f"{message}  ✖", bg=color, fg='white', font=('Arial', 10),
+                         wraplength=360, justify=tk.LEFT, padx=10, pady=6, cursor='hand2')
+        label.pack(side=tk.BOTTOM, fill='x', pady=(4, 0))
+        label.bind('<Button-1>', lambda event: self.dismiss(label))
+        self.messages.append(label)
+        label.after(duration, lambda: self.dismiss(label))
+        while len(self.messages) > MAX_NOTIFICATIONS:
+            self.dismiss(self.messages[0])
+        self.place(relx=1.0, rely=1.0, anchor='se', x=-15, y=-30)
+        self.lift()
+    
+    def dismiss(self, label):
+        if label in self.messages:
+            self.messages.remove(label)
+            label.destroy()
+            if not self.messages:
+                self.place_forget()
+
+
+class TranscriptView(tk.Frame):
+    """Scrollable view of a TranscriptModel that only renders the segments on screen
+    
+    The scrollbar is driven by segment index rather than by widget content,
+    so the cost of a redraw depends on the window height, not on how long
+    the session has been running. The view follows new segments while it
+    is scrolled to the bottom. A partial segment is shown greyed out below
+    the last one.
+    """
+    
+    def __init__(self, master, model, dispatcher, font=('Arial', 11), **options):
+        super().__init__(master, **options)
+        self.model = model
+        self.dispatcher = dispatcher
+        self.top = 0
+        self.rows = 1
+        self.follow = True
+        self.line_height = tkfont.Font(font=font).metrics('linespace')
+        
+        self.scrollbar = tk.Scrollbar(self, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill='y')
+        self.text = tk.Text(self, height=10, width=80, wrap='word', font=font, state='disabled')
+        self.text.pack(side=tk.LEFT, fill='both', expand=True)
+        self.text.tag_configure('partial', foreground='#7f8c8d')
+        self.text.bind('<Configure>', lambda event: self.refresh())
+        self.text.bind('<MouseWheel>', self.on_wheel)
+        self.text.bind('<Button-4>', self.on_wheel)
+        self.text.bind('<Button-5>', self.on_wheel)
+        
+        model.subscribe(self.schedule_refresh)
+    
+    def visible_lines(self):
+        """Display lines that fit in the window"""
+        return max(1, self.text.winfo_height() // self.line_height)
+    
+    def rendered_lines(self):
+        """Display lines the current content takes up, after word wrapping"""
+        count = self.text.count('1.0', 'end', 'update', 'displaylines')
+        return count[0] if count else 0
+    
+    def schedule_refresh(self):
+        """Redraw once on the Tk thread, however many segments arrive before the next frame"""
+        self.dispatcher.post(self.refresh, key=('refresh', id(self)))
+    
+    def refresh(self):
+        """Render the segments scrolled into view, adding them until the window is full"""
+        partial = self.model.partial
+        count = len(self.model) + (partial is not None)
+        lines = self.visible_lines()
+        
+        self.text.config(state='normal')
+        self.text.delete(1.0, tk.END)
+        if not self.follow:
+            self.top = max(0, min(self.top, count - 1))
+            # Reaching the end from the top means we are back at the bottom
+            self.follow = not self.fill_down(partial, lines)
+            if self.follow:
+                self.text.delete(1.0, tk.END)
+        if self.follow:
+            self.fill_up(partial, lines)
+        self.text.config(state='disabled')
+        
+        if self.follow:
+            self.text.see(tk.END)
+        if count:
+            self.scrollbar.set(self.top / count, min(1.0, (self.top + self.rows) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def fill_down(self, partial, lines):
+        """Add segments below self.top; return False if they ran out before the window filled"""
+        self.rows = 0
+        # Every segment takes at least one line, so no more than this can fit
+        for segment in self.model.slice(self.top, self.top + lines):
+            self.text.insert(tk.END, ('\n\n' if self.rows else '') + segment.format())
+            self.rows += 1
+            if self.rendered_lines() >= lines:
+                return True
+        return False
+    
+    def fill_up(self, partial, lines):
+        """Add segments above the last one until the window is full, and set self.top"""
+        total = len(self.model)
+        self.rows = 0
+        if partial is not None:
+            self.text.insert(tk.END, partial.format() + ' …', 'partial')
+            self.rows = 1
+        for segment in reversed(self.model.slice(max(0, total - lines), total)):
+            if self.rows and self.rendered_lines() >= lines:
+                break
+            self.text.insert(1.0, segment.format() + ('\n\n' if self.rows else ''))
+            self.rows += 1
+        self.top = total + (partial is not None) - self.rows
+    
+    def scroll_to(self, top):
+        self.top = max(0, top)
+        self.follow = False
+        self.refresh()
+    
+    def scroll_by(self, segments):
+        self.scroll_to(self.top + segments)
+    
+    def on_wheel(self, event):
+        """Scroll by segments; 'break' keeps the Text widget from scrolling its own content"""
+        up = event.num == 4 or (event.num != 5 and event.delta > 0)
+        self.scroll_by(-1 if up else 1)
+        return 'break'
+    
+    def on_scroll(self, action, amount, unit=None):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')"""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * len(self.model)))
+        elif unit == 'pages':
+            self.scroll_by(int(amount) * max(1, self.rows - 1))
+        else:
+            self.scroll_by(int(amount))
 
 class VoiceConverterApp:
     def __init__(self, root):
@@ -20,57 +183,61 @@ class VoiceConverterApp:
         self.root.geometry("900x700")
         self.root.configure(bg='#2c3e50')
         
-        # Initialize components
-        self.tts_engine = pyttsx3.init()
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        # Widgets are only touched on the Tk thread; workers post updates here
+        self.ui = UIDispatcher(root)
         
-        # Initialize pygame for audio playback
-        pygame.mixer.init()
-        
-        # Configuration
-        self.config_file = "voice_config.json"
-        self.history_file = "voice_history.json"
-        self.load_config()
-        self.load_history()
+        # Synthesis, recognition, history and configuration
+        self.engine = VoiceEngine(on_status=self.set_status, on_history=self.on_history_entry,
+                                  on_tts_ready=self.on_tts_ready)
+        self.history_oldest_id = None
+        self.transcript = TranscriptModel()
         
         # Variables
         self.is_recording = False
-        self.is_speaking = False
+        self.stop_requested = False
+        self.listening = False
+        self.stats_job = None
         
-        self.setup_ui()
-        self.setup_tts_settings()
+        with profiler.span('build UI'):
+            self.setup_ui()
+            self.refresh_history()
         
-    def load_config(self):
-        """Load saved configuration"""
-        try:
-            with open(self.config_file, 'r') as f:
-                self.config = json.load(f)
-        except FileNotFoundError:
-            self.config = {
-                'voice_rate': 200,
-                'voice_volume': 0.9,
-                'voice_id': 0,
-                'theme': 'dark'
-            }
-    
-    def save_config(self):
-        """Save current configuration"""
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f)
-    
-    def load_history(self):
-        """Load conversation history"""
-        try:
-            with open(self.history_file, 'r') as f:
-                self.history = json.load(f)
-        except FileNotFoundError:
-            self.history = []
+        self.ui.start()
+        self.root.after_idle(self.on_window_shown)
+    
+    @property
+    def config(self):
+        return self.engine.config
     
-    def save_history(self):
-        """Save conversation history"""
-        with open(self.history_file, 'w') as f:
-            json.dump(self.history, f)
+    @property
+    def history(self):
+        return self.engine.history
+    
+    def set_status(self, message):
+        """Show a message in the status bar; safe to call from any thread"""
+        self.ui.post(self.status_var.set, message, key='status')
+    
+    def notify(self, message, level='info'):
+        """Show a non-modal notification; safe to call from any thread"""
+        self.ui.post(self.notifications.show, message, level)
+    
+    def on_tts_ready(self, error):
+        """Called by the engine once the speech engine is initialized"""
+        if error is not None:
+            self.notify(f"Speech engine unavailable: {str(error)}", 'error')
+        else:
+            self.ui.post(self.populate_voices)
+    
+    def on_window_shown(self):
+        """Warm up the audio subsystems once the window is on screen"""
+        profiler.mark('window shown')
+        threading.Thread(target=self.warm_up, name='warm-up', daemon=True).start()
+    
+    def warm_up(self):
+        """Initialize audio playback, the microphone and speech in the background"""
+        self.engine.warm_up()
+        profiler.mark('startup complete')
+        profiler.report()
     
     def setup_ui(self):
         """Setup the main user interface"""
@@ -96,6 +263,8 @@ class VoiceConverterApp:
         status_bar = tk.Label(self.root, textvariable=self.status_var, 
                              relief=tk.SUNKEN, anchor=tk.W, bg='#34495e', fg='white')
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.notifications = NotificationArea(self.root, bg='#2c3e50')
     
     def create_tts_tab(self):
         """Create Text-to-Speech tab"""
@@ -168,6 +337,12 @@ class VoiceConverterApp:
                                    font=('Arial', 14, 'bold'), padx=30, pady=10)
         self.record_btn.pack(side=tk.LEFT, padx=10)
         
+        # Hands-free button
+        self.continuous_btn = tk.Button(control_frame, text="🎧 Hands-free", 
+                                       command=self.toggle_continuous, bg='#16a085', fg='white',
+                                       font=('Arial', 12, 'bold'), padx=20)
+        self.continuous_btn.pack(side=tk.LEFT, padx=10)
+        
         # Upload audio button
         upload_btn = tk.Button(control_frame, text="📁 Upload Audio", 
                               command=self.upload_audio, bg='#9b59b6', fg='white',
@@ -179,8 +354,7 @@ class VoiceConverterApp:
                                font=('Arial', 12, 'bold'), bg='#ecf0f1')
         output_label.pack(pady=(20, 10))
         
-        self.stt_output = scrolledtext.ScrolledText(stt_frame, height=10, width=80,
-                                                   font=('Arial', 11))
+        self.stt_output = TranscriptView(stt_frame, self.transcript, self.ui, font=('Arial', 11))
         self.stt_output.pack(pady=10, padx=20, fill='both', expand=True)
         
         # Action buttons
@@ -201,7 +375,7 @@ class VoiceConverterApp:
         
         # Clear button
         clear_stt_btn = tk.Button(action_frame, text="🗑️ Clear", 
-                                 command=lambda: self.stt_output.delete(1.0, tk.END),
+                                 command=self.transcript.clear,
                                  bg='#95a5a6', fg='white', font=('Arial', 11, 'bold'), padx=15)
         clear_stt_btn.pack(side=tk.LEFT, padx=5)
     
@@ -237,6 +411,13 @@ class VoiceConverterApp:
         self.populate_voices()
         self.voice_combo.bind('<<ComboboxSelected>>', self.update_voice)
         
+        # Sentence pipelining
+        self.pipelined_var = tk.BooleanVar(value=self.config.get('pipelined_speech', True))
+        pipelined_check = tk.Checkbutton(voice_frame, text="Speak sentence by sentence (faster start)",
+                                         variable=self.pipelined_var, command=self.update_pipelined_speech,
+                                         font=('Arial', 10), bg='#ecf0f1')
+        pipelined_check.grid(row=3, column=0, columnspan=2, sticky='w', padx=10, pady=5)
+        
         # Audio settings
         audio_frame = tk.LabelFrame(settings_frame, text="Audio Settings", 
                                    font=('Arial', 12, 'bold'), bg='#ecf0f1')
@@ -248,6 +429,63 @@ class VoiceConverterApp:
                                 font=('Arial', 11, 'bold'), padx=20)
         mic_test_btn.pack(pady=10)
         
+        # Recognizer backend
+        recognizer_row = tk.Frame(audio_frame, bg='#ecf0f1')
+        recognizer_row.pack(pady=(0, 10))
+        tk.Label(recognizer_row, text="Recognizer:", font=('Arial', 10), bg='#ecf0f1').pack(side=tk.LEFT, padx=10)
+        self.recognizer_var = tk.StringVar(value=self.config.get('stt_backend', 'google'))
+        recognizer_combo = ttk.Combobox(recognizer_row, textvariable=self.recognizer_var, state="readonly",
+                                        values=[name for name in RECOGNIZER_BACKENDS if name != 'stub'])
+        recognizer_combo.pack(side=tk.LEFT)
+        recognizer_combo.bind('<<ComboboxSelected>>', self.update_recognizer)
+        tk.Label(recognizer_row, text="(sphinx and vosk work offline)", font=('Arial', 9),
+                 bg='#ecf0f1').pack(side=tk.LEFT, padx=10)
+        
+        # Second backend for slow requests
+        hedge_row = tk.Frame(audio_frame, bg='#ecf0f1')
+        hedge_row.pack(pady=(0, 10))
+        tk.Label(hedge_row, text="Hedge with:", font=('Arial', 10), bg='#ecf0f1').pack(side=tk.LEFT, padx=10)
+        self.hedge_var = tk.StringVar(value=self.config.get('stt_hedge') or 'off')
+        hedge_combo = ttk.Combobox(hedge_row, textvariable=self.hedge_var, state="readonly",
+                                   values=['off'] + [name for name in RECOGNIZER_BACKENDS if name != 'stub'])
+        hedge_combo.pack(side=tk.LEFT)
+        hedge_combo.bind('<<ComboboxSelected>>', self.update_hedge)
+        tk.Label(hedge_row, text="(also asked when the recognizer is slow)", font=('Arial', 9),
+                 bg='#ecf0f1').pack(side=tk.LEFT, padx=10)
+        
+        # Speech and transcript caches
+        cache_frame = tk.LabelFrame(settings_frame, text="Caches", 
+                                   font=('Arial', 12, 'bold'), bg='#ecf0f1')
+        cache_frame.pack(pady=20, padx=20, fill='x')
+        
+        self.cache_stats_var = tk.StringVar()
+        tk.Label(cache_frame, textvariable=self.cache_stats_var, font=('Arial', 10), justify=tk.LEFT,
+                 bg='#ecf0f1').pack(side=tk.LEFT, padx=10, pady=5)
+        clear_cache_btn = tk.Button(cache_frame, text="🗑️ Clear Cache", 
+                                   command=self.clear_speech_cache, bg='#95a5a6', fg='white',
+                                   font=('Arial', 10, 'bold'), padx=10)
+        clear_cache_btn.pack(side=tk.RIGHT, padx=10, pady=5)
+        self.update_cache_stats()
+        
+        # Per-stage latency metrics
+        metrics_frame = tk.LabelFrame(settings_frame, text="Performance", 
+                                     font=('Arial', 12, 'bold'), bg='#ecf0f1')
+        metrics_frame.pack(pady=20, padx=20, fill='x')
+        
+        metrics_controls = tk.Frame(metrics_frame, bg='#ecf0f1')
+        metrics_controls.pack(fill='x')
+        self.live_stats_var = tk.BooleanVar(value=False)
+        live_stats_check = tk.Checkbutton(metrics_controls, text="Show live stage timings",
+                                          variable=self.live_stats_var, command=self.toggle_live_stats,
+                                          font=('Arial', 10), bg='#ecf0f1')
+        live_stats_check.pack(side=tk.LEFT, padx=10, pady=5)
+        export_metrics_btn = tk.Button(metrics_controls, text="💾 Export Metrics", 
+                                      command=self.export_metrics, bg='#2ecc71', fg='white',
+                                      font=('Arial', 10, 'bold'), padx=10)
+        export_metrics_btn.pack(side=tk.RIGHT, padx=10, pady=5)
+        
+        self.stats_text = tk.Text(metrics_frame, height=8, font=('Courier', 9), state='disabled')
+        
         # Reset settings
         reset_btn = tk.Button(settings_frame, text="🔄 Reset to Defaults", 
                              command=self.reset_settings, bg='#e67e22', fg='white',
@@ -259,9 +497,40 @@ class VoiceConverterApp:
         history_frame = ttk.Frame(self.notebook)
         self.notebook.add(history_frame, text='📝 History')
         
-        # History listbox
+        # Type filter
+        filter_frame = tk.Frame(history_frame, bg='#ecf0f1')
+        filter_frame.pack(fill='x', padx=20, pady=(20, 0))
+        tk.Label(filter_frame, text="Show:", font=('Arial', 10), bg='#ecf0f1').pack(side=tk.LEFT)
+        self.history_type_var = tk.StringVar(value="All")
+        self.history_type_combo = ttk.Combobox(filter_frame, textvariable=self.history_type_var,
+                                               values=["All", "TTS", "STT", "STT (File)"], state="readonly")
+        self.history_type_combo.pack(side=tk.LEFT, padx=5)
+        self.history_type_combo.bind('<<ComboboxSelected>>', lambda event: self.refresh_history())
+        
+        # Full-text search with optional date range
+        tk.Label(filter_frame, text="Search:", font=('Arial', 10), bg='#ecf0f1').pack(side=tk.LEFT, padx=(10, 0))
+        self.history_search_var = tk.StringVar()
+        search_entry = tk.Entry(filter_frame, textvariable=self.history_search_var, font=('Arial', 10))
+        search_entry.pack(side=tk.LEFT, padx=5, fill='x', expand=True)
+        search_entry.bind('<Return>', lambda event: self.refresh_history())
+        
+        tk.Label(filter_frame, text="From:", font=('Arial', 10), bg='#ecf0f1').pack(side=tk.LEFT)
+        self.history_since_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=self.history_since_var, width=11,
+                 font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        tk.Label(filter_frame, text="To:", font=('Arial', 10), bg='#ecf0f1').pack(side=tk.LEFT)
+        self.history_until_var = tk.StringVar()
+        tk.Entry(filter_frame, textvariable=self.history_until_var, width=11,
+                 font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        
+        search_btn = tk.Button(filter_frame, text="🔍 Search", 
+                              command=self.refresh_history, bg='#3498db', fg='white',
+                              font=('Arial', 10, 'bold'), padx=10)
+        search_btn.pack(side=tk.LEFT, padx=5)
+        
+        # History listbox (newest first)
         self.history_listbox = tk.Listbox(history_frame, font=('Arial', 10))
-        self.history_listbox.pack(fill='both', expand=True, padx=20, pady=20)
+        self.history_listbox.pack(fill='both', expand=True, padx=20, pady=10)
         
         # History buttons
         hist_btn_frame = tk.Frame(history_frame, bg='#ecf0f1')
@@ -272,6 +541,11 @@ class VoiceConverterApp:
                                font=('Arial', 11, 'bold'), padx=15)
         refresh_btn.pack(side=tk.LEFT, padx=5)
         
+        more_btn = tk.Button(hist_btn_frame, text="⏬ Load Older", 
+                            command=self.load_more_history, bg='#3498db', fg='white',
+                            font=('Arial', 11, 'bold'), padx=15)
+        more_btn.pack(side=tk.LEFT, padx=5)
+        
         clear_hist_btn = tk.Button(hist_btn_frame, text="🗑️ Clear History", 
                                   command=self.clear_history, bg='#e74c3c', fg='white',
                                   font=('Arial', 11, 'bold'), padx=15)
@@ -282,23 +556,9 @@ class VoiceConverterApp:
                               font=('Arial', 11, 'bold'), padx=15)
         export_btn.pack(side=tk.LEFT, padx=5)
     
-    def setup_tts_settings(self):
-        """Configure TTS engine with saved settings"""
-        self.tts_engine.setProperty('rate', self.config['voice_rate'])
-        self.tts_engine.setProperty('volume', self.config['voice_volume'])
-        
-        voices = self.tts_engine.getProperty('voices')
-        if voices and self.config['voice_id'] < len(voices):
-            self.tts_engine.setProperty('voice', voices[self.config['voice_id']].id)
-    
     def populate_voices(self):
         """Populate voice selection combobox"""
-        voices = self.tts_engine.getProperty('voices')
-        voice_names = []
-        for i, voice in enumerate(voices):
-            name = voice.name if hasattr(voice, 'name') else f"Voice {i+1}"
-            voice_names.append(name)
-        
+        voice_names = self.engine.voice_names
         self.voice_combo['values'] = voice_names
         if voice_names:
             self.voice_combo.current(self.config.get('voice_id', 0))
@@ -310,31 +570,33 @@ class VoiceConverterApp:
             messagebox.showwarning("Warning", "Please enter some text to speak!")
             return
         
-        def speak():
-            try:
-                self.is_speaking = True
-                self.speak_btn.config(state='disabled')
-                self.status_var.set("Speaking...")
-                
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
-                
-                # Add to history
-                self.add_to_history("TTS", text)
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Speech synthesis failed: {str(e)}")
-            finally:
-                self.is_speaking = False
-                self.speak_btn.config(state='normal')
-                self.status_var.set("Ready")
-        
-        threading.Thread(target=speak, daemon=True).start()
+        self.engine.speak(text, on_start=self.on_speech_start, on_done=self.on_speech_done)
+        self.update_speech_status()
+    
+    def on_speech_start(self, request):
+        """Called by the speech worker when a request starts playing"""
+        self.ui.post(self.update_speech_status, key='status')
+    
+    def on_speech_done(self, request):
+        """Called by the speech worker when a request finishes or is cancelled"""
+        if request.status == 'error':
+            self.notify(f"Speech synthesis failed: {str(request.error)}", 'error')
+        self.ui.post(self.update_speech_status, key='status')
+    
+    def update_speech_status(self):
+        """Show whether speech is playing and how many requests are queued"""
+        worker = self.engine.speech_worker
+        queued = worker.queue_depth
+        if worker.busy:
+            self.status_var.set(f"Speaking... ({queued} queued)" if queued else "Speaking...")
+        elif queued:
+            self.status_var.set(f"{queued} queued")
+        else:
+            self.status_var.set("Ready")
     
     def stop_speaking(self):
-        """Stop current speech"""
-        if self.is_speaking:
-            self.tts_engine.stop()
+        """Stop current speech and drop anything queued"""
+        self.engine.stop_speaking()
     
     def save_audio(self):
         """Save TTS as audio file"""
@@ -344,18 +606,85 @@ class VoiceConverterApp:
             return
         
         filename = filedialog.asksaveasfilename(
-            defaultextension=".mp3",
-            filetypes=[("MP3 files", "*.mp3"), ("WAV files", "*.wav")],
+            defaultextension=".wav",
+            filetypes=[("WAV files (offline)", "*.wav"), ("MP3 files (Google TTS)", "*.mp3")],
             title="Save Audio File"
         )
         
+        if not filename:
+            return
+        
+        # WAV renders on the speech worker, so it may wait for current speech
+        def save():
+            try:
+                self.set_status("Saving audio...")
+                self.engine.save_audio(text, filename)
+                self.ui.post(self.update_cache_stats, key='cache-stats')
+                self.notify(f"Audio saved as {filename}")
+            except Exception as e:
+                self.notify(f"Failed to save audio: {str(e)}", 'error')
+            finally:
+                self.set_status("Ready")
+        
+        threading.Thread(target=save, daemon=True).start()
+    
+    def update_cache_stats(self):
+        """Show speech and transcript cache statistics in the Settings tab"""
+        lines = []
+        for label, unit, cache in (("Speech", "clips", self.engine.speech_cache),
+                                   ("Transcripts", "results", self.engine.transcript_cache)):
+            stats = cache.stats()
+            lines.append(f"{label}: {stats['entries']} {unit}, {stats['bytes'] / (1024 * 1024):.1f} of "
+                         f"{stats['max_bytes'] / (1024 * 1024):.0f} MB, "
+                         f"{stats['hits']} hits / {stats['misses']} misses")
+        self.cache_stats_var.set('\n'.join(lines))
+    
+    def clear_speech_cache(self):
+        """Delete all cached speech clips and transcripts"""
+        self.engine.speech_cache.clear()
+        self.engine.transcript_cache.clear()
+        self.update_cache_stats()
+    
+    def toggle_live_stats(self):
+        """Show or hide the live per-stage timing table"""
+        if self.live_stats_var.get():
+            self.stats_text.pack(fill='x', padx=10, pady=(0, 10))
+            self.update_live_stats()
+        else:
+            if self.stats_job is not None:
+                self.root.after_cancel(self.stats_job)
+                self.stats_job = None
+            self.stats_text.pack_forget()
+    
+    def update_live_stats(self):
+        """Refresh the timing table and schedule the next refresh"""
+        def ms(value):
+            return f"{value:.1f}" if value is not None else "-"
+        
+        lines = [f"{'stage':<24}{'count':>7}{'errors':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for stage, stats in metrics.snapshot().items():
+            lines.append(f"{stage:<24}{stats['count']:>7}{stats['errors']:>7}{ms(stats['p50_ms']):>10}"
+                         f"{ms(stats['p95_ms']):>10}{ms(stats['p99_ms']):>10}")
+        self.stats_text.config(state='normal', height=min(max(len(lines), 2), 16))
+        self.stats_text.delete(1.0, tk.END)
+        self.stats_text.insert(1.0, '\n'.join(lines))
+        self.stats_text.config(state='disabled')
+        self.stats_job = self.root.after(STATS_REFRESH_MS, self.update_live_stats)
+    
+    def export_metrics(self):
+        """Save the stage timings as Prometheus text or JSON"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".prom",
+            filetypes=[("Prometheus text", "*.prom"), ("JSON files", "*.json")],
+            title="Export Metrics"
+        )
+        
         if filename:
             try:
-                tts = gTTS(text=text, lang='en')
-                tts.save(filename)
-                messagebox.showinfo("Success", f"Audio saved as {filename}")
+                metrics.write(filename)
+                messagebox.showinfo("Success", f"Metrics exported to {filename}")
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to save audio: {str(e)}")
+                messagebox.showerror("Error", f"Failed to export metrics: {str(e)}")
     
     def toggle_recording(self):
         """Start or stop recording"""
@@ -367,76 +696,128 @@ class VoiceConverterApp:
     def start_recording(self):
         """Start speech recognition"""
         def record():
+            import speech_recognition as sr
             try:
-                self.is_recording = True
-                self.record_btn.config(text="⏹️ Stop Recording", bg='#27ae60')
-                self.status_var.set("Listening... Speak now!")
-                
-                with self.microphone as source:
-                    self.recognizer.adjust_for_ambient_noise(source)
-                    audio = self.recognizer.listen(source, timeout=10)
-                
-                self.status_var.set("Processing speech...")
-                text = self.recognizer.recognize_google(audio)
+                self.set_status("Listening... Speak now!")
                 
-                # Display result
-                self.stt_output.insert(tk.END, f"[{datetime.now().strftime('%H:%M:%S')}] {text}\n\n")
-                self.stt_output.see(tk.END)
+                live = self.engine.partials_enabled()
+                text = self.engine.listen(timeout=10,
+                                          on_processing=lambda: self.set_status("Processing speech..."),
+                                          on_partial=self.show_partial if live else None)
                 
-                # Add to history
-                self.add_to_history("STT", text)
-                
-                messagebox.showinfo("Success", "Speech recognized successfully!")
+                self.transcript.append(text, "Microphone")
+                self.notify("Speech recognized successfully!")
                 
             except sr.WaitTimeoutError:
-                messagebox.showwarning("Timeout", "No speech detected. Please try again.")
+                if not self.stop_requested:
+                    self.notify("No speech detected. Please try again.", 'warning')
             except sr.UnknownValueError:
-                messagebox.showwarning("Recognition Error", "Could not understand the speech. Please try again.")
+                self.notify("Could not understand the speech. Please try again.", 'warning')
             except sr.RequestError as e:
-                messagebox.showerror("Error", f"Speech recognition service error: {str(e)}")
+                self.notify(f"Speech recognition service error: {str(e)}", 'error')
             except Exception as e:
-                messagebox.showerror("Error", f"Recording failed: {str(e)}")
+                self.notify(f"Recording failed: {str(e)}", 'error')
             finally:
+                self.transcript.clear_partial()
                 self.is_recording = False
-                self.record_btn.config(text="🎙️ Start Recording", bg='#e74c3c')
-                self.status_var.set("Ready")
+                self.ui.post(self.record_btn.config, {'text': "🎙️ Start Recording", 'bg': '#e74c3c'},
+                             key='record-button')
+                self.set_status("Ready")
         
+        self.is_recording = True
+        self.stop_requested = False
+        self.record_btn.config(text="⏹️ Stop Recording", bg='#27ae60')
         threading.Thread(target=record, daemon=True).start()
     
+    def show_partial(self, text):
+        """Show the hypothesis for the phrase being recorded; the final transcript replaces it"""
+        self.transcript.set_partial(text, "Microphone")
+    
     def stop_recording(self):
-        """Stop recording (handled automatically by the recording thread)"""
-        pass
+        """End the phrase being recorded and transcribe it, or stop a hands-free session"""
+        if self.is_recording and not self.stop_requested:
+            self.stop_requested = True
+            self.engine.end_phrase()
+            self.set_status("Stopping...")
+        self.stop_continuous()
+    
+    def toggle_continuous(self):
+        """Start or stop hands-free continuous listening"""
+        if not self.listening:
+            self.start_continuous()
+        else:
+            self.stop_continuous()
+    
+    def start_continuous(self):
+        """Keep the microphone open and transcribe every utterance until stopped"""
+        if self.is_recording:
+            return
+        try:
+            self.engine.start_listening(self.on_continuous_transcript, self.on_continuous_error)
+        except Exception as e:
+            self.notify(f"Hands-free listening failed: {str(e)}", 'error')
+            return
+        self.listening = True
+        self.continuous_btn.config(text="⏹️ Stop Hands-free", bg='#27ae60')
+        self.record_btn.config(state='disabled')
+        self.set_status("Hands-free listening... speak any time")
+    
+    def stop_continuous(self):
+        """End the hands-free session after pending transcripts arrive"""
+        if not self.listening:
+            return
+        self.listening = False
+        self.set_status("Finishing transcription...")
+        self.continuous_btn.config(state='disabled')
+        
+        def finish():
+            self.engine.stop_listening()
+            self.ui.post(self.continuous_btn.config, {'text': "🎧 Hands-free", 'bg': '#16a085', 'state': 'normal'})
+            self.ui.post(self.record_btn.config, {'state': 'normal'})
+            self.set_status("Ready")
+        
+        threading.Thread(target=finish, daemon=True).start()
+    
+    def on_continuous_transcript(self, timestamp, text):
+        """Append a hands-free transcript; called in spoken order"""
+        self.transcript.append(text, "Hands-free", timestamp=timestamp)
+    
+    def on_continuous_error(self, error):
+        """Report a hands-free session error without ending the session"""
+        import speech_recognition as sr
+        if isinstance(error, sr.RequestError):
+            self.notify(f"Speech recognition service error: {str(error)}", 'error')
+        else:
+            self.notify(f"Hands-free listening failed: {str(error)}", 'error')
+            self.ui.post(self.stop_continuous)
     
     def upload_audio(self):
         """Upload and process audio file"""
         filename = filedialog.askopenfilename(
-            filetypes=[("Audio files", "*.wav *.mp3 *.flac *.m4a"), ("All files", "*.*")],
+            filetypes=[("Audio files", "*.wav *.mp3 *.flac *.m4a *.aiff *.aif"), ("All files", "*.*")],
             title="Select Audio File"
         )
         
         if filename:
             def process_audio():
+                from streaming_transcribe import format_timestamp
+                source = f"File: {os.path.basename(filename)}"
+                
+                def show_segment(segment):
+                    self.transcript.append(segment['text'], source, offset=segment['start'])
+                    self.set_status(f"Processing audio file... {format_timestamp(segment['end'])}")
+                
                 try:
-                    self.status_var.set("Processing audio file...")
-                    
-                    with sr.AudioFile(filename) as source:
-                        audio = self.recognizer.record(source)
+                    self.set_status("Processing audio file...")
                     
-                    text = self.recognizer.recognize_google(audio)
-                    
-                    # Display result
-                    self.stt_output.insert(tk.END, f"[File: {os.path.basename(filename)}] {text}\n\n")
-                    self.stt_output.see(tk.END)
-                    
-                    # Add to history
-                    self.add_to_history("STT (File)", text)
-                    
-                    messagebox.showinfo("Success", "Audio file processed successfully!")
+                    self.engine.transcribe_file(filename, on_segment=show_segment)
+                    self.ui.post(self.update_cache_stats, key='cache-stats')
+                    self.notify(f"{os.path.basename(filename)} processed successfully!")
                     
                 except Exception as e:
-                    messagebox.showerror("Error", f"Failed to process audio file: {str(e)}")
+                    self.notify(f"Failed to process {os.path.basename(filename)}: {str(e)}", 'error')
                 finally:
-                    self.status_var.set("Ready")
+                    self.set_status("Ready")
             
             threading.Thread(target=process_audio, daemon=True).start()
     
@@ -449,136 +830,165 @@ class VoiceConverterApp:
             self.tts_text.insert(1.0, phrase)
     
     def copy_to_tts(self):
-        """Copy STT output to TTS input"""
-        stt_text = self.stt_output.get(1.0, tk.END).strip()
+        """Copy the recognized text to TTS input"""
+        stt_text = self.transcript.text()
         if stt_text:
-            # Extract just the recognized text (remove timestamps and labels)
-            lines = stt_text.split('\n')
-            clean_text = []
-            for line in lines:
-                if '] ' in line:
-                    clean_text.append(line.split('] ', 1)[1])
-            
             self.tts_text.delete(1.0, tk.END)
-            self.tts_text.insert(1.0, ' '.join(clean_text))
+            self.tts_text.insert(1.0, stt_text)
             
             # Switch to TTS tab
             self.notebook.select(0)
     
     def save_text(self):
-        """Save STT output as text file"""
-        text = self.stt_output.get(1.0, tk.END).strip()
-        if not text:
+        """Save the transcript as a text or JSON file"""
+        if not len(self.transcript):
             messagebox.showwarning("Warning", "No text to save!")
             return
         
         filename = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            filetypes=[("Text files", "*.txt"), ("JSON files", "*.json"), ("All files", "*.*")],
             title="Save Text File"
         )
         
         if filename:
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(text)
+                self.transcript.export(filename)
                 messagebox.showinfo("Success", f"Text saved as {filename}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save text: {str(e)}")
     
     def update_voice_rate(self, value):
         """Update TTS speech rate"""
-        self.config['voice_rate'] = int(value)
-        self.tts_engine.setProperty('rate', int(value))
-        self.save_config()
+        self.engine.update_config(voice_rate=int(value))
     
     def update_voice_volume(self, value):
         """Update TTS volume"""
-        self.config['voice_volume'] = float(value)
-        self.tts_engine.setProperty('volume', float(value))
-        self.save_config()
+        self.engine.update_config(voice_volume=float(value))
+    
+    def update_pipelined_speech(self):
+        """Toggle sentence-pipelined speech output"""
+        self.engine.update_config(pipelined_speech=self.pipelined_var.get())
     
     def update_voice(self, event=None):
         """Update selected voice"""
-        selection = self.voice_combo.current()
-        self.config['voice_id'] = selection
-        
-        voices = self.tts_engine.getProperty('voices')
-        if voices and selection < len(voices):
-            self.tts_engine.setProperty('voice', voices[selection].id)
-        
-        self.save_config()
+        self.engine.update_config(voice_id=self.voice_combo.current())
+    
+    def update_recognizer(self, event=None):
+        """Switch the speech recognition backend"""
+        name = self.recognizer_var.get()
+        try:
+            self.engine.select_recognizer(name)
+            self.set_status(f"Recognizer: {name}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not use the {name} recognizer: {str(e)}")
+            self.recognizer_var.set(self.config.get('stt_backend', 'google'))
+    
+    def update_hedge(self, event=None):
+        """Choose the backend that slow recognition requests are also sent to"""
+        name = self.hedge_var.get()
+        try:
+            self.engine.select_hedge(None if name == 'off' else name)
+            self.set_status("Hedged recognition off" if name == 'off'
+                            else f"Slow requests are also sent to {name}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not hedge with the {name} recognizer: {str(e)}")
+            self.hedge_var.set(self.config.get('stt_hedge') or 'off')
     
     def test_microphone(self):
         """Test microphone functionality"""
         def test():
             try:
-                self.status_var.set("Testing microphone...")
-                with self.microphone as source:
-                    self.recognizer.adjust_for_ambient_noise(source, duration=2)
-                messagebox.showinfo("Microphone Test", "Microphone is working properly!")
+                self.set_status("Testing microphone...")
+                result = self.engine.test_microphone()
+                self.notify(f"Microphone is working properly!\n"
+                            f"Device: {result['device']}\n"
+                            f"Noise floor: {result['noise_floor']:.0f}, "
+                            f"energy threshold: {result['threshold']:.0f}")
             except Exception as e:
-                messagebox.showerror("Microphone Error", f"Microphone test failed: {str(e)}")
+                self.notify(f"Microphone test failed: {str(e)}", 'error')
             finally:
-                self.status_var.set("Ready")
+                self.set_status("Ready")
         
         threading.Thread(target=test, daemon=True).start()
     
     def reset_settings(self):
         """Reset all settings to defaults"""
         if messagebox.askyesno("Reset Settings", "Are you sure you want to reset all settings to defaults?"):
-            self.config = {
-                'voice_rate': 200,
-                'voice_volume': 0.9,
-                'voice_id': 0,
-                'theme': 'dark'
-            }
+            # The speech worker applies the new settings with the next request
+            self.engine.reset_config()
             
             # Update UI
             self.rate_var.set(200)
             self.volume_var.set(0.9)
             self.voice_combo.current(0)
-            
-            # Update TTS engine
-            self.setup_tts_settings()
-            self.save_config()
+            self.pipelined_var.set(True)
+            self.recognizer_var.set('google')
+            self.hedge_var.set('off')
             
             messagebox.showinfo("Reset Complete", "Settings have been reset to defaults!")
     
-    def add_to_history(self, type_str, text):
-        """Add entry to history"""
-        entry = {
-            'timestamp': datetime.now().isoformat(),
-            'type': type_str,
-            'text': text[:100] + "..." if len(text) > 100 else text
-        }
-        self.history.append(entry)
-        
-        # Keep only last 100 entries
-        if len(self.history) > 100:
-            self.history = self.history[-100:]
-        
-        self.save_history()
-        self.refresh_history()
+    def on_history_entry(self, entry):
+        """Called by the engine, possibly from a worker thread, when an entry is recorded"""
+        self.ui.post(self.show_history_entry, entry)
+    
+    def show_history_entry(self, entry):
+        """Show a new history entry recorded by the engine"""
+        # Update the view in place instead of rebuilding it; a filtered
+        # view is left alone until the next search
+        if (self.history_filter() in (None, [entry['type']]) and not self.history_search_var.get().strip()
+                and not self.history_since_var.get().strip() and not self.history_until_var.get().strip()):
+            self.history_listbox.insert(0, self.format_history_entry(entry))
+            if self.history_oldest_id is None:
+                self.history_oldest_id = entry['id']
+    
+    def history_filter(self):
+        """Return the entry types selected in the History tab, or None for all"""
+        selected = self.history_type_var.get()
+        return None if selected == "All" else [selected]
+    
+    def format_history_entry(self, entry):
+        """Format one history entry as a listbox row"""
+        timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M')
+        text = entry['text'][:100] + "..." if len(entry['text']) > 100 else entry['text']
+        return f"[{timestamp}] {entry['type']}: {text}"
     
     def refresh_history(self):
-        """Refresh history display"""
+        """Refresh history display with the most recent page"""
         self.history_listbox.delete(0, tk.END)
-        for entry in reversed(self.history):
-            timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M')
-            display_text = f"[{timestamp}] {entry['type']}: {entry['text']}"
-            self.history_listbox.insert(0, display_text)
+        self.history_oldest_id = None
+        self.load_more_history()
+    
+    def load_more_history(self):
+        """Append the next page of older entries to the history display"""
+        try:
+            since = parse_date(self.history_since_var.get().strip())
+            until = parse_date(self.history_until_var.get().strip())
+        except ValueError:
+            messagebox.showwarning("Warning", "Dates must be in YYYY-MM-DD format!")
+            return
+        
+        query = self.history_search_var.get().strip()
+        if query:
+            entries = self.history.search(query, start=since, end=until, types=self.history_filter(),
+                                          before_id=self.history_oldest_id, limit=HISTORY_PAGE_SIZE)
+        else:
+            entries = self.history.query(start=since, end=until, types=self.history_filter(),
+                                         before_id=self.history_oldest_id, limit=HISTORY_PAGE_SIZE)
+        for entry in entries:
+            self.history_listbox.insert(tk.END, self.format_history_entry(entry))
+        if entries:
+            self.history_oldest_id = entries[-1]['id']
     
     def clear_history(self):
         """Clear all history"""
         if messagebox.askyesno("Clear History", "Are you sure you want to clear all history?"):
-            self.history = []
-            self.save_history()
+            self.history.clear()
             self.refresh_history()
     
     def export_history(self):
         """Export history to file"""
-        if not self.history:
+        if not self.history.count():
             messagebox.showwarning("Warning", "No history to export!")
             return
         
@@ -590,22 +1000,23 @@ class VoiceConverterApp:
         
         if filename:
             try:
-                if filename.endswith('.json'):
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        json.dump(self.history, f, indent=2)
-                else:
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        for entry in self.history:
-                            timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
-                            f.write(f"[{timestamp}] {entry['type']}: {entry['text']}\n\n")
-                
+                self.engine.export_history(filename)
                 messagebox.showinfo("Success", f"History exported to {filename}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to export history: {str(e)}")
 
+    def on_close(self):
+        """Stop background workers and close the window"""
+        if self.stats_job is not None:
+            self.root.after_cancel(self.stats_job)
+        self.ui.stop()
+        self.engine.close()
+        self.root.destroy()
+
 def main():
     root = tk.Tk()
     app = VoiceConverterApp(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,285 @@
+"""
+Single long-lived speech synthesis worker
+pyttsx3 engines are not thread-safe, so every utterance goes through one
+worker thread that owns the engine. Requests wait in a priority queue where
+identical pending requests are coalesced, and any request can be cancelled
+by id or flushed along with whatever is currently playing. Other work that
+needs the engine (such as rendering to a file) runs on the same thread via
+call().
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future
+
+from metrics import metrics
+from speech_pipeline import SpeechPipeline, pyttsx3_synthesizer
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class SpeechRequest:
+    """One queued utterance"""
+
+    def __init__(self, request_id, text, priority, settings):
+        self.id = request_id
+        self.text = text
+        self.priority = priority
+        self.settings = settings
+        self.status = 'pending'
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.on_start = []
+        self.on_done = []
+
+    @property
+    def key(self):
+        return (self.text, tuple(sorted(self.settings.items())))
+
+
+class SpeechWorker:
+    """Drives one TTS engine from a dedicated thread
+
+    The engine is created by engine_factory on the worker thread itself, so
+    constructing the worker is cheap and the engine never touches another
+    thread. on_ready(worker) is called once the engine exists (or failed to
+    initialize, in which case worker.error is set). on_finished(request) is
+    called once for every request that finishes, fails or is cancelled.
+    """
+
+    def __init__(self, engine_factory, player=None, pipelined=True, on_ready=None, on_finished=None):
+        self.engine_factory = engine_factory
+        self.engine = None
+        self.error = None
+        self.player = player
+        self.pipelined = pipelined
+        self.on_ready = on_ready
+        self.on_finished = on_finished
+        self.ready = threading.Event()
+        self._cond = threading.Condition()
+        self._heap = []
+        self._pending = {}   # request id -> request
+        self._by_key = {}    # (text, settings) -> pending request, for coalescing
+        self._jobs = deque()  # (func, future) pairs from call(), run before utterances
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._current = None
+        self._pipeline = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='tts-worker', daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        """Number of requests waiting to be spoken"""
+        with self._cond:
+            return len(self._pending)
+
+    @property
+    def busy(self):
+        """True while an utterance is being spoken"""
+        with self._cond:
+            return self._current is not None
+
+    def submit(self, text, priority=PRIORITY_NORMAL, settings=None, on_start=None, on_done=None):
+        """Queue text for speaking and return its request id
+
+        Submitting the same text with the same settings while an earlier copy
+        is still pending returns the pending request's id instead of queueing
+        a duplicate.
+        """
+        settings = settings or {}
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Speech worker has been shut down")
+            request = self._by_key.get((text, tuple(sorted(settings.items()))))
+            if request is None:
+                request = SpeechRequest(next(self._ids), text, priority, settings)
+                self._pending[request.id] = request
+                self._by_key[request.key] = request
+                heapq.heappush(self._heap, (priority, next(self._seq), request))
+            elif priority < request.priority:
+                # Re-queue at the higher priority; the old heap entry goes stale
+                request.priority = priority
+                heapq.heappush(self._heap, (priority, next(self._seq), request))
+            if on_start and on_start not in request.on_start:
+                request.on_start.append(on_start)
+            if on_done and on_done not in request.on_done:
+                request.on_done.append(on_done)
+            self._cond.notify()
+            return request.id
+
+    def call(self, func):
+        """Run func(engine) on the worker thread and return a Future with its result
+
+        Jobs run ahead of queued utterances but never interrupt the one being
+        spoken. flush() leaves them alone; shutdown() cancels any still waiting.
+        """
+        future = Future()
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Speech worker has been shut down")
+            self._jobs.append((func, future))
+            self._cond.notify()
+        return future
+
+    def cancel(self, request_id):
+        """Cancel a pending or playing request; return False if it is unknown"""
+        with self._cond:
+            request = self._pending.pop(request_id, None)
+            if request is not None:
+                self._by_key.pop(request.key, None)
+                request.status = 'cancelled'
+            elif self._current is not None and self._current.id == request_id:
+                self._interrupt()
+                return True
+            else:
+                return False
+        self._finish(request)
+        return True
+
+    def flush(self):
+        """Cancel everything queued and stop the current utterance"""
+        with self._cond:
+            cancelled = list(self._pending.values())
+            self._pending.clear()
+            self._by_key.clear()
+            self._heap.clear()
+            self._interrupt()
+        for request in cancelled:
+            request.status = 'cancelled'
+            self._finish(request)
+        return len(cancelled)
+
+    def shutdown(self, timeout=None):
+        """Flush the queue and stop the worker thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.flush()
+        with self._cond:
+            jobs = list(self._jobs)
+            self._jobs.clear()
+        for _func, future in jobs:
+            future.cancel()
+        self._thread.join(timeout)
+
+    def _interrupt(self):
+        """Stop the utterance in progress; caller holds the lock"""
+        if self._current is None:
+            return
+        self._current.status = 'cancelled'
+        if self._pipeline is not None:
+            self._pipeline.cancel()
+        elif self.engine is not None:
+            self.engine.stop()
+
+    def _next_request(self):
+        """Block until a job or live request is available, or return None on shutdown"""
+        with self._cond:
+            while True:
+                if self._jobs:
+                    return self._jobs.popleft()
+                while self._heap:
+                    priority, _seq, request = heapq.heappop(self._heap)
+                    # Skip cancelled requests and entries superseded by a re-queue
+                    if request.status != 'pending' or priority != request.priority:
+                        continue
+                    if self._pending.pop(request.id, None) is None:
+                        continue
+                    self._by_key.pop(request.key, None)
+                    request.status = 'speaking'
+                    self._current = request
+                    if self.pipelined:
+                        self._pipeline = SpeechPipeline(pyttsx3_synthesizer(self.engine), self.player)
+                    return request
+                if not self._running:
+                    return None
+                self._cond.wait()
+
+    def _apply_settings(self, settings):
+        """Configure the engine for the next utterance"""
+        for name in ('rate', 'volume', 'voice'):
+            if settings.get(name) is not None:
+                self.engine.setProperty(name, settings[name])
+
+    def _speak(self, request):
+        if self.engine is None:
+            raise RuntimeError(f"Speech engine unavailable: {self.error}")
+        self._apply_settings(request.settings)
+        if self._pipeline is not None:
+            first = []
+
+            def on_segment(segment):
+                if not first:
+                    first.append(segment)
+                    metrics.observe('tts.first_audio', time.perf_counter() - request.submitted)
+
+            self._pipeline.speak(request.text, on_segment)
+        else:
+            self.engine.say(request.text)
+            self.engine.runAndWait()
+
+    def _run(self):
+        try:
+            self.engine = self.engine_factory()
+        except Exception as e:
+            self.error = e
+        self.ready.set()
+        if self.on_ready:
+            self._notify([self.on_ready], self)
+
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            if isinstance(request, tuple):
+                self._run_job(*request)
+                continue
+            metrics.observe('tts.queue_wait', time.perf_counter() - request.submitted)
+            self._notify(request.on_start, request)
+            start = time.perf_counter()
+            try:
+                if request.status == 'speaking':
+                    self._speak(request)
+            except Exception as e:
+                request.error = e
+            finally:
+                with self._cond:
+                    if request.error is not None:
+                        request.status = 'error'
+                    elif request.status == 'speaking':
+                        request.status = 'done'
+                    self._current = None
+                    self._pipeline = None
+            metrics.observe('tts.speak', time.perf_counter() - start, error=request.error is not None)
+            self._finish(request)
+
+    def _run_job(self, func, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            if self.engine is None:
+                raise RuntimeError(f"Speech engine unavailable: {self.error}")
+            future.set_result(func(self.engine))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _finish(self, request):
+        """Run the completion callbacks for a request"""
+        callbacks = [self.on_finished] if self.on_finished else []
+        self._notify(callbacks + request.on_done, request)
+
+    @staticmethod
+    def _notify(callbacks, arg):
+        for callback in callbacks:
+            try:
+                callback(arg)
+            except Exception:
+                traceback.print_exc()
@@ -0,0 +1,85 @@
+"""
+Thread-safe dispatch of GUI updates onto the Tk main loop
+Tk widgets may only be touched from the thread running mainloop(). Worker
+threads post callables to a UIDispatcher instead, and the main loop drains
+them once per frame with root.after: updates posted under the same key
+(the status bar, one view's redraw) collapse into the latest one, a frame
+stops after a time budget so a burst of updates cannot freeze the window,
+and how late each frame runs is recorded as the ui.loop_lag metric.
+"""
+
+import itertools
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from metrics import metrics
+
+# Milliseconds between drains of the queue
+FRAME_MS = 16
+
+# Seconds of posted work run per frame before the rest waits for the next one
+FRAME_BUDGET = 0.010
+
+
+class UIDispatcher:
+    """Queue of callables run on the Tk main loop, drained once per frame"""
+
+    def __init__(self, root, frame_ms=FRAME_MS, budget=FRAME_BUDGET):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.budget = budget
+        self._pending = OrderedDict()    # key -> (func, args, posted_at)
+        self._unique = itertools.count()
+        self._lock = threading.Lock()
+        self._job = None
+        self._due = None
+
+    @property
+    def depth(self):
+        """Updates waiting for the next frame"""
+        with self._lock:
+            return len(self._pending)
+
+    def start(self):
+        """Start draining; call from the main thread"""
+        if self._job is None:
+            self._schedule()
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def post(self, func, *args, key=None):
+        """Run func(*args) on the main loop; may be called from any thread
+
+        Of several posts with the same key before the next frame, only the
+        last one runs, in the place of the first.
+        """
+        with self._lock:
+            if key is None:
+                key = ('unique', next(self._unique))
+            self._pending[key] = (func, args, time.perf_counter())
+
+    def _schedule(self):
+        self._due = time.perf_counter() + self.frame_ms / 1000.0
+        self._job = self.root.after(self.frame_ms, self._drain)
+
+    def _drain(self):
+        start = time.perf_counter()
+        metrics.observe('ui.loop_lag', max(0.0, start - self._due))
+        try:
+            while time.perf_counter() - start < self.budget:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    key, (func, args, posted_at) = self._pending.popitem(last=False)
+                metrics.observe('ui.dispatch', time.perf_counter() - posted_at)
+                try:
+                    func(*args)
+                except Exception:
+                    traceback.print_exc()
+        finally:
+            self._schedule()
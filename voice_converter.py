@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Command line entry point for Voice Converter Pro
+Run without arguments to open the GUI, or pass a subcommand for headless jobs.
+"""
+
+import importlib
+import sys
+
+from startup_profile import profiler
+
+# Subcommand name -> module providing main(argv)
+COMMANDS = {
+    'transcribe': 'batch_transcribe',
+    'synthesize': 'batch_synthesize',
+    'stream': 'streaming_transcribe',
+    'search': 'history_store',
+    'serve': 'service',
+    'bench': 'benchmarks',
+}
+
+USAGE = """usage: voice-converter [--startup-profile[=FILE]] [command] [options]
+
+Without a command the desktop application is started.
+--startup-profile prints per-import and per-init timings once the app has
+started, and also writes them as JSON when FILE is given.
+
+commands:
+  transcribe   transcribe a directory or glob of audio files to JSONL
+  synthesize   export a CSV or JSONL file of prompts as audio files
+  stream       transcribe one long recording in bounded memory
+  search       full-text search over TTS and STT history
+  serve        run the headless TTS/STT HTTP service
+  bench        run the offline benchmark suite
+"""
+
+
+def main(argv=None):
+    """Dispatch to a subcommand or launch the GUI"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    for arg in list(argv):
+        if arg == '--startup-profile' or arg.startswith('--startup-profile='):
+            argv.remove(arg)
+            profiler.enable(output_file=arg.partition('=')[2] or None)
+
+    if argv and argv[0] in ('-h', '--help'):
+        print(USAGE)
+        return 0
+
+    if argv and argv[0] in COMMANDS:
+        module = importlib.import_module(COMMANDS[argv[0]])
+        return module.main(argv[1:])
+
+    if argv:
+        print(f"Unknown command: {argv[0]}\n")
+        print(USAGE)
+        return 2
+
+    import tts_stt_app
+    tts_stt_app.main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,682 @@
+"""
+GUI-independent engine core for Voice Converter Pro
+VoiceEngine owns configuration, history, speech synthesis and recognition
+with no dependency on Tk, so the desktop app, the demo script and headless
+workers all drive the same code. Every operation has a blocking method and
+an `async` counterpart that runs it off the event loop.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import threading
+from contextlib import ExitStack
+
+from audio_io import decode_audio, encode_wav, resample
+from history_store import HistoryStore
+from http_transport import TransportError, configure_transport
+from metrics import metrics
+from recognizers import FailoverRecognizer, HedgedRecognizer, backend_available, create_recognizer
+from playback import AudioPlayer
+from speech_pipeline import pyttsx3_synthesizer
+from startup_profile import profiler
+from stt_cache import DEFAULT_CACHE_DIR as STT_CACHE_DIR, CachedRecognizer, TranscriptCache
+from synthesizers import GTTSSynthesizer
+from tts_cache import DEFAULT_CACHE_DIR, SpeechCache
+from tts_worker import PRIORITY_NORMAL, SpeechWorker
+
+# pyttsx3, speech_recognition, pygame, pyaudio and numpy are imported lazily
+# where they are first needed, so creating an engine is cheap and works on
+# machines without an audio device.
+
+DEFAULT_CONFIG = {
+    'voice_rate': 200,
+    'voice_volume': 0.9,
+    'voice_id': 0,
+    'theme': 'dark'
+}
+
+
+class VoiceEngine:
+    """Synthesis, recognition, history and config behind one object
+
+    Callbacks may be called from worker threads:
+      on_status(message)   a subsystem failed to start during warm_up()
+      on_history(entry)    an entry was added to the history
+      on_tts_ready(error)  the speech engine is initialized (error is None) or failed
+
+    stt_backend and synthesizer replace the default Google backends, e.g.
+    with the stub backends for offline use; a given stt_backend is used as
+    is, without the transcript cache.
+    """
+
+    def __init__(self, config_file='voice_config.json', history_file='voice_history.db',
+                 legacy_history_file='voice_history.json', cache_dir=DEFAULT_CACHE_DIR,
+                 on_status=None, on_history=None, on_tts_ready=None, stt_backend=None,
+                 synthesizer=None, stt_cache_dir=STT_CACHE_DIR):
+        self.config_file = config_file
+        self.history_file = history_file
+        self.legacy_history_file = legacy_history_file
+        self.cache_dir = cache_dir
+        self.on_status = on_status
+        self.on_history = on_history
+        self.on_tts_ready = on_tts_ready
+
+        # Audio components are created on first use (see the properties below)
+        self._init_lock = threading.RLock()
+        self._recognizer = None
+        self._microphone = None
+        self._stt_backend = stt_backend
+        self._synthesizer = synthesizer
+        self._noise_tracker = None
+        self._speech_worker = None
+        self.voice_ids = []
+        self.voice_names = []
+        self.speech_player = AudioPlayer()
+        self.listener = None
+        self._phrase_stop = threading.Event()
+
+        with profiler.span('load config'):
+            self.load_config()
+        if self.config.get('http'):
+            # Timeouts, retries and breaker settings for Google STT/TTS, see HTTPTransport
+            configure_transport(**self.config['http'])
+        with profiler.span('open history'):
+            self.load_history()
+        with profiler.span('open speech cache'):
+            self.speech_cache = SpeechCache(cache_dir, max_bytes=self.config.get('tts_cache_mb', 200) * 1024 * 1024)
+        with profiler.span('open transcript cache'):
+            self.transcript_cache = TranscriptCache(stt_cache_dir,
+                                                    max_bytes=self.config.get('stt_cache_mb', 50) * 1024 * 1024)
+
+    # Configuration
+
+    def load_config(self):
+        """Load saved configuration"""
+        try:
+            with open(self.config_file, 'r') as f:
+                self.config = json.load(f)
+        except FileNotFoundError:
+            self.config = dict(DEFAULT_CONFIG)
+
+    def save_config(self):
+        """Save current configuration"""
+        with open(self.config_file, 'w') as f:
+            json.dump(self.config, f)
+
+    def update_config(self, **values):
+        """Change and save settings; speech settings apply from the next request"""
+        self.config.update(values)
+        if 'pipelined_speech' in values and self._speech_worker is not None:
+            self._speech_worker.pipelined = values['pipelined_speech']
+        self.save_config()
+
+    def reset_config(self):
+        """Restore and save the default settings"""
+        self.config = dict(DEFAULT_CONFIG)
+        if self._speech_worker is not None:
+            self._speech_worker.pipelined = True
+        with self._init_lock:
+            self._stt_backend = None
+        self.save_config()
+
+    # Lazily created subsystems
+
+    @property
+    def recognizer(self):
+        """speech_recognition Recognizer, created on first use"""
+        with self._init_lock:
+            if self._recognizer is None:
+                with profiler.span('sr.Recognizer()'):
+                    import speech_recognition as sr
+                    self._recognizer = sr.Recognizer()
+            return self._recognizer
+
+    @property
+    def microphone(self):
+        """Default input device, opened on first use"""
+        with self._init_lock:
+            if self._microphone is None:
+                with profiler.span('sr.Microphone()'):
+                    import speech_recognition as sr
+                    self._microphone = sr.Microphone()
+            return self._microphone
+
+    @property
+    def stt_backend(self):
+        """Recognizer backend used for microphone input, files and hands-free listening
+
+        Chosen by the stt_backend config key (google, sphinx, vosk or
+        module:Class); stt_options maps backend names to their keyword
+        arguments, e.g. {"vosk": {"model_path": "models/vosk-en"}}. Remote
+        backends fall back to the stt_fallback backend (sphinx by default,
+        null to turn it off) while the service is unreachable, if the module
+        it needs is installed. With stt_hedge
+        set to a second backend, slow requests are hedged (see select_hedge).
+        """
+        with self._init_lock:
+            if self._stt_backend is None:
+                name = self.config.get('stt_backend', 'google')
+                with profiler.span('recognizer backend'):
+                    self._stt_backend = self._create_backend(name, self.config.get('stt_options', {}))
+            return self._stt_backend
+
+    def _create_backend(self, name, all_options):
+        """Create a recognizer backend with hedging, the transcript cache and, if remote, its local fallback"""
+        backend = create_recognizer(name, **all_options.get(name, {}))
+        hedge = self.config.get('stt_hedge')
+        if hedge and hedge != name:
+            backend = HedgedRecognizer(backend, create_recognizer(hedge, **all_options.get(hedge, {})),
+                                       percentile=self.config.get('stt_hedge_percentile', 95))
+        backend = self._with_cache(backend)
+        fallback = self.config.get('stt_fallback', 'sphinx')
+        # pocketsphinx is optional; without it every failover would only fail a second time
+        if backend.remote and fallback and fallback != name and backend_available(fallback):
+            backend = FailoverRecognizer(
+                backend, self._with_cache(create_recognizer(fallback, **all_options.get(fallback, {}))),
+                on_failover=lambda error: self._status(
+                    f"Speech service unreachable, using the offline {fallback} recognizer: {str(error)}"))
+        return backend
+
+    def _with_cache(self, backend):
+        """Serve repeated audio from the transcript cache unless stt_cache is turned off"""
+        if self.config.get('stt_cache', True):
+            return CachedRecognizer(backend, self.transcript_cache)
+        return backend
+
+    @staticmethod
+    def _map_caches(backend, replace):
+        """Rebuild a recognizer chain with replace(cached) in place of each CachedRecognizer"""
+        if isinstance(backend, FailoverRecognizer):
+            return FailoverRecognizer(VoiceEngine._map_caches(backend.primary, replace),
+                                      VoiceEngine._map_caches(backend.fallback, replace), backend.on_failover)
+        if isinstance(backend, CachedRecognizer):
+            return replace(backend)
+        return backend
+
+    def _partial_backend(self):
+        """Recognizer chain for live partial transcripts
+
+        Without the transcript cache, and without failover so a flaky service
+        does not report a failover for every partial of a phrase.
+        """
+        backend = self.stt_backend
+        if isinstance(backend, FailoverRecognizer):
+            backend = backend.primary
+        return self._map_caches(backend, lambda cached: cached.backend)
+
+    def partials_enabled(self):
+        """Whether listen() should report partial transcripts
+
+        The partial_transcripts config key decides when set; by default only
+        backends that decode incrementally (Vosk) show them, since the others
+        re-send the whole phrase so far for every update.
+        """
+        enabled = self.config.get('partial_transcripts')
+        if enabled is None:
+            return self.stt_backend.incremental
+        return enabled
+
+    def select_recognizer(self, name, options=None):
+        """Switch recognizer backends, save the choice and load its model in the background
+
+        Without options, the options saved earlier for that backend are used.
+        """
+        all_options = dict(self.config.get('stt_options', {}))
+        if options is not None:
+            all_options[name] = options
+        backend = self._create_backend(name, all_options)
+        with self._init_lock:
+            self._stt_backend = backend
+        self.update_config(stt_backend=name, stt_options=all_options)
+        threading.Thread(target=self.preload_recognizer, name='recognizer-preload', daemon=True).start()
+        return backend
+
+    def select_hedge(self, name):
+        """Hedge recognition with a second backend, or stop hedging with None
+
+        A request still unanswered after the stt_hedge_percentile (95 by
+        default) of the recognizer's recent latencies is sent to this
+        backend as well and the first answer wins.
+        """
+        self.update_config(stt_hedge=name)
+        return self.select_recognizer(self.config.get('stt_backend', 'google'))
+
+    def hedge_stats(self):
+        """Hedge delay and per-backend latency statistics, or None when not hedging"""
+        backend = self.stt_backend
+        while backend is not None and not isinstance(backend, HedgedRecognizer):
+            backend = getattr(backend, 'primary', None) or getattr(backend, 'backend', None)
+        return backend.latency_stats() if backend is not None else None
+
+    def preload_recognizer(self):
+        """Load the offline recognizer model, if any, so the first request is fast"""
+        try:
+            with profiler.span('recognizer model'):
+                self.stt_backend.preload()
+        except Exception as e:
+            self._status(f"Recognizer unavailable: {str(e)}")
+
+    @property
+    def synthesizer(self):
+        """Synthesis backend used for saved audio, backed by the speech cache"""
+        with self._init_lock:
+            if self._synthesizer is None:
+                self._synthesizer = GTTSSynthesizer(language=self.config.get('tts_language', 'en'),
+                                                    cache=self.speech_cache)
+            return self._synthesizer
+
+    @property
+    def noise_tracker(self):
+        """Background noise-floor tracker for the microphone"""
+        with self._init_lock:
+            if self._noise_tracker is None:
+                microphone = self.microphone
+                with profiler.span('noise floor tracker'):
+                    import speech_recognition as sr
+                    from noise_floor import NoiseFloorTracker, device_name
+                    # Same device, separate instance: sr.Microphone can't be entered twice
+                    tracker_microphone = sr.Microphone(device_index=microphone.device_index)
+                    self._noise_tracker = NoiseFloorTracker(self.recognizer, tracker_microphone,
+                                                            device=device_name(microphone))
+            return self._noise_tracker
+
+    @property
+    def speech_worker(self):
+        """Speech worker thread owning the pyttsx3 engine, started on first use"""
+        with self._init_lock:
+            if self._speech_worker is None:
+                self._speech_worker = SpeechWorker(self.create_tts_engine, self.speech_player,
+                                                   pipelined=self.config.get('pipelined_speech', True),
+                                                   on_ready=self._tts_ready,
+                                                   on_finished=self._record_speech)
+            return self._speech_worker
+
+    def create_tts_engine(self):
+        """Create the TTS engine; runs on the speech worker thread"""
+        with profiler.span('pyttsx3.init()'):
+            import pyttsx3
+            engine = pyttsx3.init()
+        self.setup_tts_settings(engine)
+        return engine
+
+    def setup_tts_settings(self, engine):
+        """Configure a new TTS engine with saved settings and list its voices"""
+        engine.setProperty('rate', self.config['voice_rate'])
+        engine.setProperty('volume', self.config['voice_volume'])
+
+        voices = engine.getProperty('voices') or []
+        self.voice_names = [voice.name if hasattr(voice, 'name') else f"Voice {i+1}"
+                            for i, voice in enumerate(voices)]
+        self.voice_ids = [voice.id for voice in voices]
+        if self.config['voice_id'] < len(self.voice_ids):
+            engine.setProperty('voice', self.voice_ids[self.config['voice_id']])
+
+    def _tts_ready(self, worker):
+        if self.on_tts_ready:
+            self.on_tts_ready(worker.error)
+
+    def warm_up(self):
+        """Initialize playback, the microphone and the speech engine ahead of first use
+
+        Blocks until the speech engine is ready; failures are reported
+        through on_status rather than raised.
+        """
+        worker = self.speech_worker
+        try:
+            with profiler.span('pygame.mixer.init()'):
+                self.speech_player.warm_up()
+        except Exception as e:
+            self._status(f"Audio playback unavailable: {str(e)}")
+
+        self.preload_recognizer()
+
+        try:
+            if self.config.get('noise_tracking', True):
+                self.noise_tracker.start()
+            else:
+                self.microphone
+        except Exception as e:
+            self._status(f"No microphone available: {str(e)}")
+
+        worker.ready.wait()
+
+    def _status(self, message):
+        if self.on_status:
+            self.on_status(message)
+
+    # Text-to-speech
+
+    def speech_settings(self):
+        """Snapshot of the voice settings sent with each speech request"""
+        voice_id = self.config.get('voice_id', 0)
+        return {
+            'rate': self.config['voice_rate'],
+            'volume': self.config['voice_volume'],
+            'voice': self.voice_ids[voice_id] if voice_id < len(self.voice_ids) else None,
+        }
+
+    def speak(self, text, priority=PRIORITY_NORMAL, settings=None, on_start=None, on_done=None,
+              wait=False):
+        """Queue text to be spoken and return the request id
+
+        settings override the saved voice settings for this request only.
+        With wait=True, block until the request finishes and raise if it failed.
+        """
+        speech_settings = self.speech_settings()
+        speech_settings.update(settings or {})
+        if not wait:
+            return self.speech_worker.submit(text, priority, speech_settings, on_start=on_start, on_done=on_done)
+
+        finished = threading.Event()
+        result = []
+
+        def done(request):
+            result.append(request)
+            try:
+                if on_done:
+                    on_done(request)
+            finally:
+                finished.set()
+
+        request_id = self.speech_worker.submit(text, priority, speech_settings, on_start=on_start, on_done=done)
+        finished.wait()
+        if result[0].status == 'error':
+            raise result[0].error
+        return request_id
+
+    def _record_speech(self, request):
+        if request.status == 'done':
+            self.add_history("TTS", request.text)
+
+    def stop_speaking(self):
+        """Stop current speech and drop anything queued"""
+        if self._speech_worker is not None:
+            self._speech_worker.flush()
+
+    def pause_speaking(self):
+        """Pause the clip being played; return False when nothing is playing"""
+        return self.speech_player.pause()
+
+    def resume_speaking(self):
+        """Resume after pause_speaking(); return False when not paused"""
+        return self.speech_player.resume()
+
+    def synthesize(self, text):
+        """Return audio for text from the synthesis backend (MP3 from Google TTS by default)"""
+        with metrics.span('tts.synthesize'):
+            return self.synthesizer.synthesize(text)
+
+    def render_wav(self, text, sample_rate=None, sample_width=None, channels=None):
+        """Render text to PCM WAV bytes offline with the current voice settings
+
+        sample_rate (Hz), sample_width (bytes) and channels convert the
+        output; they default to the export_* config values, or to the
+        voice's own sample rate as 16-bit mono.
+        """
+        with metrics.span('tts.render_wav'):
+            if self.synthesizer.content_type == 'audio/wav':
+                data = self.synthesize(text)
+            else:
+                data = self._render_system_voice(text)
+            samples, rate = decode_audio(data)
+            sample_rate = sample_rate or self.config.get('export_sample_rate') or rate
+            sample_width = sample_width or self.config.get('export_sample_width', 2)
+            channels = channels or self.config.get('export_channels', 1)
+            return encode_wav(resample(samples, rate, sample_rate), sample_rate, sample_width, channels)
+
+    def _render_system_voice(self, text):
+        """Render text with the speech worker's pyttsx3 engine, through the speech cache"""
+        settings = self.speech_settings()
+        key = self.speech_cache.key(text, None, 'pyttsx3', settings['rate'], settings['voice'],
+                                    settings['volume'])
+        data = self.speech_cache.get(key)
+        if data is not None:
+            return data
+
+        def render(engine):
+            for name, value in settings.items():
+                if value is not None:
+                    engine.setProperty(name, value)
+            return pyttsx3_synthesizer(engine)(text)
+
+        # The engine belongs to the worker thread, so the render waits for
+        # the current utterance to finish rather than using a second engine
+        data = self.speech_worker.call(render).result()
+        self.speech_cache.put(key, data, '.wav')
+        return data
+
+    def save_audio(self, text, filename, sample_rate=None, sample_width=None, channels=None):
+        """Synthesize text and write it to an audio file in the format its extension names
+
+        .wav is rendered locally (see render_wav, which takes the conversion
+        arguments); .mp3 comes from the synthesis backend (Google TTS by default).
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == '.wav':
+            data = self.render_wav(text, sample_rate, sample_width, channels)
+        elif extension == '.mp3':
+            if self.synthesizer.content_type != 'audio/mpeg':
+                raise ValueError(f"The {self.synthesizer.name} backend cannot produce MP3; save as .wav")
+            try:
+                data = self.synthesize(text)
+            except Exception as e:
+                if isinstance(e.__cause__, TransportError):
+                    raise RuntimeError(f"{str(e)}; save as .wav to use the offline voice") from e
+                raise
+        else:
+            raise ValueError(f"Unsupported audio format: {extension or filename}")
+        with metrics.span('tts.write_file'):
+            with open(filename, 'wb') as f:
+                f.write(data)
+
+    # Speech-to-text
+
+    def transcribe(self, frame_data, sample_rate, sample_width):
+        """Return the transcript of raw mono PCM audio"""
+        with metrics.span('stt.recognize'):
+            return self.stt_backend.recognize(frame_data, sample_rate, sample_width)
+
+    def listen(self, timeout=10, phrase_time_limit=None, on_processing=None, on_partial=None):
+        """Record one phrase from the microphone and return its transcript
+
+        on_partial(text) is called from a worker thread with the hypothesis
+        for the speech so far, every partial_interval seconds (0.3 by
+        default, 1.0 for backends that re-recognize the whole phrase) while
+        the phrase is being recorded; partial transcripts skip the transcript
+        cache and the fallback recognizer. on_processing() is called once the
+        phrase has been captured and recognition starts. end_phrase() stops
+        recording early. Raises the speech_recognition errors
+        (WaitTimeoutError, UnknownValueError, RequestError) on failure.
+        """
+        from partial_transcribe import PartialTranscriber, PhraseStopper
+        self._phrase_stop.clear()
+        with metrics.span('stt.request'):
+            with metrics.span('stt.mic_wait'):
+                self.noise_tracker.pause()
+            try:
+                with ExitStack() as stack:
+                    with metrics.span('stt.mic_open'):
+                        source = stack.enter_context(self.microphone)
+                    if not self.noise_tracker.calibrated:
+                        # First use of this device: calibrate once, then track in the background
+                        with metrics.span('stt.calibrate'):
+                            self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                        self.noise_tracker.set_threshold(self.recognizer.energy_threshold)
+                    if on_partial:
+                        backend = self._partial_backend()
+                        interval = self.config.get('partial_interval', 0.3 if backend.incremental else 1.0)
+                        stack.enter_context(PartialTranscriber(backend, source, self.recognizer,
+                                                               on_partial, interval=interval))
+                    stack.enter_context(PhraseStopper(source, self.recognizer, self._phrase_stop))
+                    with metrics.span('stt.listen'):
+                        audio = self.recognizer.listen(source, timeout=timeout,
+                                                       phrase_time_limit=phrase_time_limit)
+            finally:
+                self.noise_tracker.resume()
+
+            if on_processing:
+                on_processing()
+            with metrics.span('stt.recognize'):
+                text = self.stt_backend.recognize_audio(audio)
+            self.add_history("STT", text)
+            return text
+
+    def end_phrase(self):
+        """Stop the recording in listen() now and recognize what was captured
+
+        If no speech was heard yet, listen() raises WaitTimeoutError.
+        """
+        self._phrase_stop.set()
+
+    def transcribe_file(self, filename, on_segment=None, bypass_cache=False):
+        """Transcribe an audio file and return the full transcript
+
+        The file is streamed window by window as 16 kHz mono and
+        on_segment(segment) is called for each recognized segment as it
+        arrives. MP3 and M4A need ffmpeg. Windows recognized before come from
+        the transcript cache unless bypass_cache is set.
+        """
+        import speech_recognition as sr
+        from streaming_transcribe import stitch_transcript, stream_transcribe
+        recognizer = self.stt_backend
+        if bypass_cache:
+            # Re-recognize every window and replace what the cache holds
+            recognizer = self._map_caches(
+                recognizer, lambda cached: CachedRecognizer(cached.backend, cached.cache, bypass=True))
+        with metrics.span('stt.file'):
+            segments = []
+            for segment in stream_transcribe(filename, recognizer):
+                if not segment['text']:
+                    continue
+                segments.append(segment)
+                if on_segment:
+                    on_segment(segment)
+            text = stitch_transcript(segments)
+
+            if not text:
+                raise sr.UnknownValueError("No speech recognized in the audio file")
+            self.add_history("STT (File)", text)
+            return text
+
+    def test_microphone(self):
+        """Read a moment of audio and return the device and its noise statistics"""
+        self.noise_tracker.pause()
+        try:
+            with self.microphone as source:
+                # A quarter second of audio is enough to prove the device works
+                frames = source.SAMPLE_RATE // 4
+                data = source.stream.read(frames)
+                self.noise_tracker.feed(data, source.SAMPLE_WIDTH, source.SAMPLE_RATE)
+        finally:
+            self.noise_tracker.resume()
+        return {
+            'device': self.noise_tracker.device,
+            'noise_floor': self.noise_tracker.noise_floor,
+            'threshold': self.noise_tracker.threshold,
+        }
+
+    def start_listening(self, on_transcript, on_error=None):
+        """Start hands-free listening; on_transcript(timestamp, text) is called in spoken order"""
+        if self.listener is not None:
+            raise RuntimeError("Hands-free listening is already running")
+        from continuous_listen import ContinuousListener
+
+        def transcript(timestamp, text):
+            self.add_history("STT", text)
+            on_transcript(timestamp, text)
+
+        self.noise_tracker.pause()
+        self.listener = ContinuousListener(self.microphone, self.recognizer, self.stt_backend,
+                                           on_transcript=transcript, on_error=on_error,
+                                           noise_tracker=self.noise_tracker,
+                                           workers=self.config.get('recognizer_workers', 4))
+        self.listener.start()
+        return self.listener
+
+    def stop_listening(self, timeout=30.0):
+        """Stop hands-free listening and wait for pending transcripts"""
+        listener, self.listener = self.listener, None
+        if listener is None:
+            return
+        listener.stop(timeout)
+        self.noise_tracker.resume()
+
+    # History
+
+    def load_history(self):
+        """Open the conversation history store"""
+        self.history = HistoryStore(self.history_file,
+                                    retention_days=self.config.get('history_retention_days'),
+                                    max_entries=self.config.get('history_max_entries'))
+        self.history.import_json(self.legacy_history_file)
+
+    def add_history(self, type_str, text):
+        """Add an entry to the history and notify on_history"""
+        entry = self.history.add(type_str, text)
+        if self.on_history:
+            self.on_history(entry)
+        return entry
+
+    def export_history(self, filename):
+        """Write the whole history as JSON (.json) or plain text"""
+        from datetime import datetime
+        with open(filename, 'w', encoding='utf-8') as f:
+            if os.path.splitext(filename)[1].lower() == '.json':
+                json.dump(list(self.history.iter_entries()), f, indent=2)
+            else:
+                for entry in self.history.iter_entries():
+                    timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+                    f.write(f"[{timestamp}] {entry['type']}: {entry['text']}\n\n")
+
+    # Async API
+
+    async def _in_thread(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def speak_async(self, text, priority=PRIORITY_NORMAL, settings=None):
+        """Speak text and return the finished SpeechRequest; raises if synthesis failed"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def done(request):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(request))
+
+        self.speak(text, priority, settings, on_done=done)
+        request = await future
+        if request.status == 'error':
+            raise request.error
+        return request
+
+    async def synthesize_async(self, text):
+        return await self._in_thread(self.synthesize, text)
+
+    async def save_audio_async(self, text, filename, sample_rate=None, sample_width=None, channels=None):
+        return await self._in_thread(self.save_audio, text, filename, sample_rate, sample_width, channels)
+
+    async def transcribe_async(self, frame_data, sample_rate, sample_width):
+        return await self._in_thread(self.transcribe, frame_data, sample_rate, sample_width)
+
+    async def listen_async(self, timeout=10, phrase_time_limit=None, on_partial=None):
+        return await self._in_thread(self.listen, timeout, phrase_time_limit, None, on_partial)
+
+    async def transcribe_file_async(self, filename, on_segment=None, bypass_cache=False):
+        return await self._in_thread(self.transcribe_file, filename, on_segment, bypass_cache)
+
+    async def test_microphone_async(self):
+        return await self._in_thread(self.test_microphone)
+
+    def close(self):
+        """Stop background workers, write the metrics file if configured and close the history"""
+        if self.listener is not None:
+            self.listener.stop(timeout=1.0)
+            self.listener = None
+        if self._noise_tracker is not None:
+            self._noise_tracker.stop()
+        if self._speech_worker is not None:
+            self._speech_worker.shutdown(timeout=1.0)
+        if self.config.get('metrics_file'):
+            metrics.write(self.config['metrics_file'])
+        self.history.close()